@@ -11,10 +11,25 @@ from flask_cors import CORS
 import sqlite3
 import os
 import json
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 from datetime import datetime, timedelta
 import hashlib
 import secrets
+import threading
+import time
+import re
+import cProfile
+import pstats
+import io
+import gzip
+import shutil
+import queue
+import urllib.parse
+import urllib.request
+from collections import OrderedDict
+
+import repository
 
 app = Flask(__name__)
 CORS(app)
@@ -30,6 +45,84 @@ if not os.path.exists(UPLOAD_FOLDER):
 
 DATABASE = 'data.db'
 
+# Order idempotency: explicit Idempotency-Key headers are honored for 24 hours,
+# content fingerprints (name + WhatsApp + product + quantity) for 10 minutes.
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+ORDER_DEDUPE_WINDOW = timedelta(minutes=10)
+IDEMPOTENCY_CACHE_SIZE = 1024
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+# Image store: unreferenced files are deleted by the background GC once they
+# have been orphaned for longer than the grace period.
+IMAGE_GC_INTERVAL = 3600  # seconds
+IMAGE_GC_GRACE = timedelta(hours=1)
+
+# Chunked uploads: streamed to UPLOAD_TMP_FOLDER, abandoned after UPLOAD_TTL
+UPLOAD_TMP_FOLDER = 'tmp/uploads'
+MAX_IMAGE_SIZE = 5 * 1024 * 1024
+UPLOAD_TTL = timedelta(hours=24)
+IMAGE_SIGNATURES = {
+    'png': [b'\x89PNG\r\n\x1a\n'],
+    'jpeg': [b'\xff\xd8\xff'],
+    'gif': [b'GIF87a', b'GIF89a'],
+}
+IMAGE_SIGNATURE_BYTES = 12  # enough for every signature above plus RIFF....WEBP
+
+if not os.path.exists(UPLOAD_TMP_FOLDER):
+    os.makedirs(UPLOAD_TMP_FOLDER)
+
+# Request profiler (admin opt-in via X-Profile header or ?_profile=1);
+# only the newest PROFILE_KEEP profiles are kept on disk
+PROFILE_FOLDER = 'tmp/profiles'
+PROFILE_KEEP = 50
+PROFILE_TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+if not os.path.exists(PROFILE_FOLDER):
+    os.makedirs(PROFILE_FOLDER)
+
+# Online backups: copied BACKUP_PAGES_PER_STEP pages at a time with a pause
+# between steps, verified, gzipped, newest BACKUP_KEEP kept
+BACKUP_FOLDER = 'backups'
+BACKUP_PAGES_PER_STEP = 256
+BACKUP_STEP_SLEEP = 0.05  # seconds
+BACKUP_MAX_RESTARTS = 3
+BACKUP_KEEP = 7
+BACKUP_DATABASES = ('data', 'archive')  # file prefixes in BACKUP_FOLDER
+BACKUP_INTERVAL = 24 * 3600  # seconds
+
+# Order archive: finished orders ('selesai'/'batal') older than ARCHIVE_AFTER
+# move to ARCHIVE_DATABASE in batches; list_orders ATTACHes it only when needed
+ARCHIVE_DATABASE = 'archive.db'
+ARCHIVE_AFTER = timedelta(days=180)
+ARCHIVE_BATCH_SIZE = 500
+ARCHIVE_BATCH_SLEEP = 0.05  # seconds
+ARCHIVE_INTERVAL = 24 * 3600  # seconds
+ORDER_COLUMNS = 'id, customer_name, whatsapp, email, product, quantity, address, note, status, created_at, updated_at, customer_phone'
+
+# Numbers without a country code are taken as Indonesian
+DEFAULT_COUNTRY_CODE = '62'
+# Bumped when the totals definition changes so the startup backfill runs again
+# (v2: cancelled orders no longer count towards order_count / total_quantity)
+CUSTOMERS_BACKFILL_KEY = 'customers_backfilled_v2'
+
+# Translation memory: TRANSLATION_BACKEND is 'mymemory' (remote) or 'stub' (local, for tests)
+TRANSLATION_BACKEND = os.environ.get('TRANSLATION_BACKEND', 'mymemory')
+TRANSLATION_SOURCE = 'id'
+TRANSLATION_TARGETS = ['en']
+TRANSLATE_MAX_BATCH = 100
+TRANSLATE_MAX_CHARS = 5000  # per text
+TRANSLATE_MAX_BATCH_CHARS = 20000  # per request
+# /api/translate is public: each request sends at most TRANSLATE_MAX_MISSES
+# strings to the backend, and only anonymous text that belongs to a product or
+# the company profile (translation_sources) is kept in the memory
+TRANSLATE_MAX_MISSES = 10
+TRANSLATE_TIMEOUT = 5  # seconds per backend call
+TRANSLATE_BACKEND_BUDGET = 15  # seconds per batch of misses
+LANGUAGE_PATTERN = re.compile(r'^[a-z]{2}(-[A-Z]{2})?$')
+
+if not os.path.exists(BACKUP_FOLDER):
+    os.makedirs(BACKUP_FOLDER)
+
 def add_column_if_missing(cursor, table, column_name, column_def):
     """Add column if not exists. If default is non-constant (e.g. CURRENT_TIMESTAMP), add without default then backfill."""
     cursor.execute(f"PRAGMA table_info({table})")
@@ -50,8 +143,8 @@ def add_column_if_missing(cursor, table, column_name, column_def):
         cursor.execute(f"UPDATE {table} SET {column_name} = CURRENT_TIMESTAMP WHERE {column_name} IS NULL")
 
 def get_db():
-    """Get database connection"""
-    conn = sqlite3.connect(DATABASE)
+    """Get database connection (URI filenames enabled for read-only ATTACH)"""
+    conn = sqlite3.connect(DATABASE, uri=True)
     conn.row_factory = sqlite3.Row
     return conn
 
@@ -59,7 +152,10 @@ def init_db():
     """Initialize database with tables"""
     conn = get_db()
     c = conn.cursor()
-    
+
+    # WAL lets online backups read while create_order keeps writing
+    c.execute('PRAGMA journal_mode=WAL')
+
     # Products table
     c.execute('''
         CREATE TABLE IF NOT EXISTS products (
@@ -143,7 +239,143 @@ def init_db():
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     ''')
-    
+
+    # Idempotency records for POST /api/orders (replayed instead of re-inserting)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS order_idempotency (
+            idem_key TEXT PRIMARY KEY,
+            request_hash TEXT NOT NULL,
+            order_id INTEGER,
+            status_code INTEGER NOT NULL,
+            response TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expires_at TIMESTAMP NOT NULL
+        )
+    ''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_order_idempotency_expires ON order_idempotency(expires_at)')
+
+    # Order lookups by date range and archiver selection
+    c.execute('CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders(created_at)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_orders_status_created ON orders(status, created_at)')
+
+    # Customers keyed by E.164 WhatsApp number; orders point at them via customer_phone
+    add_column_if_missing(c, 'orders', 'customer_phone', 'TEXT')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_orders_customer_phone ON orders(customer_phone, created_at)')
+    # Translation memory and the product/company fields whose text it holds
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS translations (
+            text_hash TEXT NOT NULL,
+            source TEXT NOT NULL,
+            target TEXT NOT NULL,
+            translated TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (text_hash, source, target)
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS translation_sources (
+            owner_type TEXT NOT NULL,
+            owner_id INTEGER NOT NULL,
+            field TEXT NOT NULL,
+            text_hash TEXT NOT NULL,
+            PRIMARY KEY (owner_type, owner_id, field)
+        )
+    ''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_translation_sources_hash ON translation_sources(text_hash)')
+
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS customers (
+            phone TEXT PRIMARY KEY,
+            name TEXT,
+            email TEXT,
+            first_order_at TIMESTAMP,
+            last_order_at TIMESTAMP,
+            order_count INTEGER DEFAULT 0,
+            total_quantity REAL DEFAULT 0
+        )
+    ''')
+    # Lifetime totals leave out cancelled orders; follow status changes in and out of 'batal'
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_orders_status_customer AFTER UPDATE OF status ON orders
+        WHEN NEW.customer_phone IS NOT NULL AND (OLD.status = 'batal') != (NEW.status = 'batal')
+        BEGIN
+            UPDATE customers
+            SET order_count = order_count + CASE WHEN NEW.status = 'batal' THEN -1 ELSE 1 END,
+                total_quantity = total_quantity + CASE WHEN NEW.status = 'batal' THEN -NEW.quantity ELSE NEW.quantity END
+            WHERE phone = NEW.customer_phone;
+        END
+    ''')
+
+    # Small key/value state (e.g. newest archived order timestamp)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS app_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
+
+    # Uploaded image files (content-addressed) and the rows that use them
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS images (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            path TEXT UNIQUE NOT NULL,
+            sha256 TEXT UNIQUE NOT NULL,
+            size INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            orphaned_at TIMESTAMP
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS image_refs (
+            owner_type TEXT NOT NULL,
+            owner_id INTEGER NOT NULL,
+            image_path TEXT NOT NULL,
+            PRIMARY KEY (owner_type, owner_id)
+        )
+    ''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_image_refs_path ON image_refs(image_path)')
+
+    # Keep image_refs in step with products/company so writes stay single-statement
+    for table, owner_type, column in [('products', 'product', 'image_path'), ('company', 'company', 'logo_path')]:
+        c.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_image_insert AFTER INSERT ON {table}
+            WHEN NEW.{column} IS NOT NULL
+            BEGIN
+                INSERT OR REPLACE INTO image_refs (owner_type, owner_id, image_path)
+                VALUES ('{owner_type}', NEW.id, NEW.{column});
+            END
+        ''')
+        c.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_image_update AFTER UPDATE OF {column} ON {table}
+            BEGIN
+                DELETE FROM image_refs WHERE owner_type = '{owner_type}' AND owner_id = OLD.id;
+                INSERT INTO image_refs (owner_type, owner_id, image_path)
+                SELECT '{owner_type}', NEW.id, NEW.{column} WHERE NEW.{column} IS NOT NULL;
+            END
+        ''')
+        c.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_image_delete AFTER DELETE ON {table}
+            BEGIN
+                DELETE FROM image_refs WHERE owner_type = '{owner_type}' AND owner_id = OLD.id;
+            END
+        ''')
+
+    # Chunked uploads in progress / finalized but not yet used by a product
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS uploads (
+            id TEXT PRIMARY KEY,
+            admin_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            ext TEXT NOT NULL,
+            total_size INTEGER,
+            received INTEGER DEFAULT 0,
+            status TEXT DEFAULT 'pending',
+            image_path TEXT,
+            created_at TIMESTAMP,
+            updated_at TIMESTAMP
+        )
+    ''')
+
     conn.commit()
     
     # Check if admin exists
@@ -183,7 +415,16 @@ def init_db():
             ''', product)
         conn.commit()
         print(f"✓ {len(products)} sample products created")
-    
+
+    rebuild_image_refs(c)
+    conn.commit()
+
+    # Bring an existing archive.db up to the current schema once at startup,
+    # so read-through queries can attach it read-only
+    if os.path.exists(ARCHIVE_DATABASE):
+        attach_archive(conn, writable=True)
+        conn.execute('DETACH DATABASE archive')
+
     conn.close()
     print("✓ Database initialized successfully!")
 
@@ -210,6 +451,19 @@ def create_session(admin_id, conn=None):
         local_conn.close()
     return token, expires_at
 
+def find_active_session(token):
+    """Look up an active session; adds 'expired' so callers can tell the two failures apart"""
+    with repository.connection(DATABASE) as conn:
+        session = repository.find_session(conn, token)
+    if not session:
+        return None
+    expires_at = session['expires_at']
+    return {
+        'admin_id': session['admin_id'],
+        'username': session['username'],
+        'expired': bool(expires_at and datetime.fromisoformat(expires_at) < datetime.utcnow())
+    }
+
 def require_auth(func):
     """Decorator to require valid session token"""
     from functools import wraps
@@ -218,26 +472,549 @@ def require_auth(func):
         token = request.headers.get('Authorization', '').strip()
         if not token:
             return jsonify({'error': 'Unauthorized'}), 401
-        conn = get_db()
-        c = conn.cursor()
-        session = c.execute('''
-            SELECT s.id, s.admin_id, s.expires_at, s.active, a.username
-            FROM admin_sessions s
-            JOIN admins a ON a.id = s.admin_id
-            WHERE s.token = ? AND s.active = 1
-        ''', (token,)).fetchone()
+        session = find_active_session(token)
         if not session:
-            conn.close()
             return jsonify({'error': 'Session tidak valid'}), 401
-        expires_at = session['expires_at']
-        if expires_at and datetime.fromisoformat(expires_at) < datetime.utcnow():
-            conn.close()
+        if session['expired']:
             return jsonify({'error': 'Session kedaluwarsa'}), 401
         request.admin_id = session['admin_id']
         request.admin_username = session['username']
         return func(*args, **kwargs)
     return wrapper
 
+# ============================================================================
+# IMAGE STORE
+# ============================================================================
+
+# Fallbacks handed out when a product or company has no image of its own
+DEFAULT_PRODUCT_IMAGE = '/images/default.jpg'
+DEFAULT_COMPANY_LOGO = '/images/logo.png'
+PLACEHOLDER_IMAGES = (DEFAULT_PRODUCT_IMAGE, DEFAULT_COMPANY_LOGO)
+
+# Paths that must survive GC: referenced by a row, by a finalized upload,
+# or a placeholder (new rows may point at one at any time)
+LIVE_IMAGE_PATHS_SQL = f'''
+    SELECT image_path FROM image_refs
+    UNION SELECT image_path FROM uploads WHERE status = 'done'
+    UNION VALUES {', '.join(f"('{path}')" for path in PLACEHOLDER_IMAGES)}
+'''
+
+def image_file_path(image_path):
+    """Map a public '/images/<name>' path to its file in UPLOAD_FOLDER"""
+    if not image_path or not image_path.startswith('/images/'):
+        return None
+    return os.path.join(UPLOAD_FOLDER, os.path.basename(image_path))
+
+def file_sha256(filepath):
+    """Hash a file on disk in 64KB blocks"""
+    hasher = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(64 * 1024), b''):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+def spool_image(file):
+    """Copy a multipart upload to a temp file in UPLOAD_FOLDER, hashing as it goes.
+    Touches no database, so callers can do it before taking the write lock.
+    Returns (tmp_path, digest, size, ext) for store_image_file."""
+    ext = file.filename.rsplit('.', 1)[1].lower()
+    tmp_path = os.path.join(UPLOAD_FOLDER, f".upload_{secrets.token_hex(8)}.tmp")
+    hasher = hashlib.sha256()
+    size = 0
+    with open(tmp_path, 'wb') as out:
+        for block in iter(lambda: file.stream.read(64 * 1024), b''):
+            hasher.update(block)
+            out.write(block)
+            size += len(block)
+    return tmp_path, hasher.hexdigest(), size, ext
+
+def store_image(c, file, prefix):
+    """Save a multipart upload, reusing an existing file with identical content.
+    Returns the public image path."""
+    tmp_path, digest, size, ext = spool_image(file)
+    return store_image_file(c, tmp_path, digest, size, ext, prefix)
+
+def store_image_file(c, tmp_path, digest, size, ext, prefix):
+    """Move a fully written temp file into the store (or drop it if the
+    content is already stored). Returns the public image path."""
+    # Claim the existing row before trusting its file: the UPDATE takes the
+    # write lock, so a GC pass either finished deleting it or cannot start
+    existing = c.execute('''
+        UPDATE images SET orphaned_at = NULL WHERE sha256 = ? RETURNING path
+    ''', (digest,)).fetchall()
+    for row in existing:
+        if os.path.exists(image_file_path(row['path'])):
+            os.remove(tmp_path)
+            return row['path']
+
+    filename = f"{prefix}_{digest[:16]}.{ext}"
+    os.replace(tmp_path, os.path.join(UPLOAD_FOLDER, filename))
+    image_path = f'/images/{filename}'
+    c.execute('''
+        INSERT OR REPLACE INTO images (path, sha256, size) VALUES (?, ?, ?)
+    ''', (image_path, digest, size))
+    return image_path
+
+def rebuild_image_refs(c):
+    """Rebuild image_refs from the products and company tables"""
+    c.execute('DELETE FROM image_refs')
+    c.execute('''
+        INSERT INTO image_refs (owner_type, owner_id, image_path)
+        SELECT 'product', id, image_path FROM products WHERE image_path IS NOT NULL
+    ''')
+    c.execute('''
+        INSERT INTO image_refs (owner_type, owner_id, image_path)
+        SELECT 'company', id, logo_path FROM company WHERE logo_path IS NOT NULL
+    ''')
+
+def sync_image_registry(c):
+    """Register files in UPLOAD_FOLDER that are not tracked yet (legacy uploads).
+    A file whose content is already stored is merged: rows using it are pointed
+    at the stored copy. Returns the duplicate files to delete after commit."""
+    duplicates = []
+    known = {row['path'] for row in c.execute('SELECT path FROM images').fetchall()}
+    stale_before = (datetime.now() - IMAGE_GC_GRACE).timestamp()
+    for name in os.listdir(UPLOAD_FOLDER):
+        filepath = os.path.join(UPLOAD_FOLDER, name)
+        if name.startswith('.upload_'):
+            # Leftover from an interrupted upload
+            if os.path.getmtime(filepath) < stale_before:
+                os.remove(filepath)
+            continue
+        image_path = f'/images/{name}'
+        if name.startswith('.') or not os.path.isfile(filepath) or image_path in known:
+            continue
+        if image_path in PLACEHOLDER_IMAGES:
+            continue  # never collected, so never registered
+        digest = file_sha256(filepath)
+        existing = c.execute('SELECT path FROM images WHERE sha256 = ?', (digest,)).fetchone()
+        if existing and os.path.exists(image_file_path(existing['path'])):
+            # Same photo stored twice: keep the registered copy
+            c.execute('UPDATE products SET image_path = ? WHERE image_path = ?', (existing['path'], image_path))
+            c.execute('UPDATE company SET logo_path = ? WHERE logo_path = ?', (existing['path'], image_path))
+            duplicates.append(filepath)
+        elif existing:
+            # The registered copy is gone from disk; this file takes its place
+            c.execute('UPDATE images SET path = ?, size = ? WHERE sha256 = ?',
+                      (image_path, os.path.getsize(filepath), digest))
+        else:
+            c.execute('INSERT INTO images (path, sha256, size) VALUES (?, ?, ?)',
+                      (image_path, digest, os.path.getsize(filepath)))
+    return duplicates
+
+def remove_files(filepaths):
+    """Delete files, ignoring ones already gone"""
+    for filepath in filepaths:
+        try:
+            os.remove(filepath)
+        except FileNotFoundError:
+            pass
+
+def collect_orphan_images(conn):
+    """One GC pass: mark unreferenced images, delete those past the grace period"""
+    c = conn.cursor()
+    purge_stale_uploads(c)
+    duplicates = sync_image_registry(c)
+    now = datetime.utcnow()
+    c.execute(f'''
+        UPDATE images SET orphaned_at = ?
+        WHERE orphaned_at IS NULL AND path NOT IN ({LIVE_IMAGE_PATHS_SQL})
+    ''', (now.isoformat(),))
+    c.execute(f'''
+        UPDATE images SET orphaned_at = NULL
+        WHERE orphaned_at IS NOT NULL AND path IN ({LIVE_IMAGE_PATHS_SQL})
+    ''')
+    expired = c.execute(
+        'SELECT path, size FROM images WHERE orphaned_at < ?',
+        ((now - IMAGE_GC_GRACE).isoformat(),)
+    ).fetchall()
+    freed = 0
+    for row in expired:
+        try:
+            os.remove(image_file_path(row['path']))
+        except FileNotFoundError:
+            pass
+        c.execute('DELETE FROM images WHERE path = ?', (row['path'],))
+        freed += row['size']
+    conn.commit()
+    remove_files(duplicates)
+    return {'deleted': len(expired), 'freed_bytes': freed, 'merged_duplicates': len(duplicates)}
+
+def image_usage_report(conn):
+    """Disk usage of the image store split into referenced and orphaned files"""
+    c = conn.cursor()
+    duplicates = sync_image_registry(c)
+    conn.commit()
+    remove_files(duplicates)
+    totals = c.execute(f'''
+        SELECT
+            COUNT(*) AS files,
+            COALESCE(SUM(size), 0) AS bytes,
+            COALESCE(SUM(CASE WHEN path IN ({LIVE_IMAGE_PATHS_SQL}) THEN 1 ELSE 0 END), 0) AS referenced_files,
+            COALESCE(SUM(CASE WHEN path IN ({LIVE_IMAGE_PATHS_SQL}) THEN size ELSE 0 END), 0) AS referenced_bytes
+        FROM images
+    ''').fetchone()
+    shared = c.execute('''
+        SELECT COUNT(*) FROM (
+            SELECT image_path FROM image_refs GROUP BY image_path HAVING COUNT(*) > 1
+        )
+    ''').fetchone()[0]
+    return {
+        'files': totals['files'],
+        'bytes': totals['bytes'],
+        'referenced_files': totals['referenced_files'],
+        'referenced_bytes': totals['referenced_bytes'],
+        'orphaned_files': totals['files'] - totals['referenced_files'],
+        'orphaned_bytes': totals['bytes'] - totals['referenced_bytes'],
+        'shared_files': shared
+    }
+
+def start_image_gc():
+    """Run collect_orphan_images every IMAGE_GC_INTERVAL seconds in a daemon thread"""
+    def loop():
+        while True:
+            try:
+                conn = get_db()
+                try:
+                    stats = collect_orphan_images(conn)
+                finally:
+                    conn.close()
+                if stats['deleted']:
+                    print(f"🧹 Image GC: {stats['deleted']} file dihapus, {stats['freed_bytes']} bytes")
+            except Exception as e:
+                print(f"⚠️ Image GC gagal: {e}")
+            time.sleep(IMAGE_GC_INTERVAL)
+    thread = threading.Thread(target=loop, name='image-gc', daemon=True)
+    thread.start()
+    return thread
+
+@app.cli.command('images-report')
+def images_report_command():
+    """Print disk usage of public/images"""
+    conn = get_db()
+    try:
+        report = image_usage_report(conn)
+    finally:
+        conn.close()
+    print(f"Files      : {report['files']} ({report['bytes']} bytes)")
+    print(f"Referenced : {report['referenced_files']} ({report['referenced_bytes']} bytes)")
+    print(f"Orphaned   : {report['orphaned_files']} ({report['orphaned_bytes']} bytes)")
+    print(f"Shared     : {report['shared_files']} file dipakai lebih dari satu baris")
+
+@app.cli.command('images-gc')
+def images_gc_command():
+    """Run one image garbage-collection pass"""
+    conn = get_db()
+    try:
+        stats = collect_orphan_images(conn)
+    finally:
+        conn.close()
+    print(f"Deleted {stats['deleted']} file(s), freed {stats['freed_bytes']} bytes")
+
+# ============================================================================
+# ORDER IDEMPOTENCY
+# ============================================================================
+
+_idempotency_cache = OrderedDict()
+_idempotency_lock = threading.Lock()
+
+def order_fingerprint(customer_name, whatsapp, product, quantity):
+    """Content fingerprint used when the client sends no Idempotency-Key"""
+    phone = ''.join(ch for ch in whatsapp if ch.isdigit())
+    raw = '|'.join([customer_name.strip().lower(), phone, product.strip().lower(), repr(float(quantity))])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+def idempotency_cache_get(key):
+    """Return cached idempotency entry if present and not expired"""
+    with _idempotency_lock:
+        entry = _idempotency_cache.get(key)
+        if entry is None:
+            return None
+        if entry['expires_at'] < datetime.utcnow().isoformat():
+            del _idempotency_cache[key]
+            return None
+        _idempotency_cache.move_to_end(key)
+        return entry
+
+def idempotency_cache_put(key, entry):
+    """Store entry in the bounded LRU cache, evicting the oldest when full"""
+    with _idempotency_lock:
+        _idempotency_cache[key] = entry
+        _idempotency_cache.move_to_end(key)
+        while len(_idempotency_cache) > IDEMPOTENCY_CACHE_SIZE:
+            _idempotency_cache.popitem(last=False)
+
+def load_idempotency_record(c, key):
+    """Read a non-expired idempotency record from the database"""
+    row = c.execute('''
+        SELECT request_hash, status_code, response, expires_at
+        FROM order_idempotency
+        WHERE idem_key = ? AND expires_at >= ?
+    ''', (key, datetime.utcnow().isoformat())).fetchone()
+    if not row:
+        return None
+    return {
+        'request_hash': row['request_hash'],
+        'status_code': row['status_code'],
+        'response': json.loads(row['response']),
+        'expires_at': row['expires_at']
+    }
+
+def replay_order_response(entry, request_hash):
+    """Build the response for a repeated order submission"""
+    if entry['request_hash'] != request_hash:
+        return jsonify({'error': 'Idempotency-Key sudah dipakai untuk pesanan lain'}), 422
+    response = jsonify(entry['response'])
+    response.status_code = entry['status_code']
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+# ============================================================================
+# ORDER ARCHIVE
+# ============================================================================
+
+def attach_archive(conn, writable=False):
+    """ATTACH archive.db as 'archive'. Read-through queries attach it read-only;
+    the archiver and backfill attach it writable and make sure its schema exists."""
+    if not writable:
+        archive_uri = f"file:{urllib.parse.quote(os.path.abspath(ARCHIVE_DATABASE))}?mode=ro"
+        conn.execute('ATTACH DATABASE ? AS archive', (archive_uri,))
+        return
+    conn.execute('ATTACH DATABASE ? AS archive', (ARCHIVE_DATABASE,))
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS archive.orders (
+            id INTEGER PRIMARY KEY,
+            customer_name TEXT NOT NULL,
+            whatsapp TEXT NOT NULL,
+            email TEXT,
+            product TEXT NOT NULL,
+            quantity REAL NOT NULL,
+            address TEXT NOT NULL,
+            note TEXT,
+            status TEXT,
+            created_at TIMESTAMP,
+            updated_at TIMESTAMP,
+            customer_phone TEXT
+        )
+    ''')
+    existing = [row[1] for row in conn.execute('PRAGMA archive.table_info(orders)').fetchall()]
+    if 'customer_phone' not in existing:
+        conn.execute('ALTER TABLE archive.orders ADD COLUMN customer_phone TEXT')
+    conn.execute('CREATE INDEX IF NOT EXISTS archive.idx_archive_orders_created_at ON orders(created_at)')
+    conn.execute('CREATE INDEX IF NOT EXISTS archive.idx_archive_orders_customer_phone ON orders(customer_phone)')
+    conn.commit()
+
+def archive_horizon(c):
+    """created_at of the newest archived order, or None if nothing is archived"""
+    row = c.execute("SELECT value FROM app_meta WHERE key = 'archive_horizon'").fetchone()
+    return row['value'] if row else None
+
+def archive_reaches(c, date_from):
+    """True when a query starting at date_from (None = no lower bound) needs the archive"""
+    horizon = archive_horizon(c)
+    if horizon is None or not os.path.exists(ARCHIVE_DATABASE):
+        return False
+    return date_from is None or date_from <= horizon
+
+def archive_orders(older_than=None):
+    """Move finished orders older than older_than (default ARCHIVE_AFTER) to
+    archive.db, ARCHIVE_BATCH_SIZE rows per transaction. Returns rows moved."""
+    cutoff = (datetime.utcnow() - (older_than or ARCHIVE_AFTER)).strftime('%Y-%m-%d %H:%M:%S')
+    conn = get_db()
+    moved = 0
+    try:
+        attach_archive(conn, writable=True)
+        c = conn.cursor()
+        while True:
+            c.execute('BEGIN IMMEDIATE')
+            ids = [row['id'] for row in c.execute('''
+                SELECT id FROM main.orders
+                WHERE status IN ('selesai', 'batal') AND created_at < ?
+                ORDER BY created_at
+                LIMIT ?
+            ''', (cutoff, ARCHIVE_BATCH_SIZE)).fetchall()]
+            if not ids:
+                conn.rollback()
+                break
+            placeholders = ','.join('?' * len(ids))
+            # OR REPLACE keeps a re-run idempotent if a previous batch was cut off
+            # between the two files (multi-file commits are not atomic under WAL)
+            c.execute(f'''
+                INSERT OR REPLACE INTO archive.orders ({ORDER_COLUMNS})
+                SELECT {ORDER_COLUMNS} FROM main.orders WHERE id IN ({placeholders})
+            ''', ids)
+            c.execute(f'DELETE FROM main.orders WHERE id IN ({placeholders})', ids)
+            c.execute('''
+                INSERT OR REPLACE INTO main.app_meta (key, value)
+                SELECT 'archive_horizon', MAX(created_at) FROM archive.orders
+            ''')
+            conn.commit()
+            moved += len(ids)
+            # Let create_order and other writers in between batches
+            time.sleep(ARCHIVE_BATCH_SLEEP)
+    finally:
+        conn.close()
+    return moved
+
+def start_order_archiver():
+    """Run archive_orders every ARCHIVE_INTERVAL seconds in a daemon thread"""
+    def loop():
+        while True:
+            try:
+                moved = archive_orders()
+                if moved:
+                    print(f"📦 Arsip pesanan: {moved} pesanan dipindahkan")
+            except Exception as e:
+                print(f"⚠️ Arsip pesanan gagal: {e}")
+            time.sleep(ARCHIVE_INTERVAL)
+    thread = threading.Thread(target=loop, name='order-archiver', daemon=True)
+    thread.start()
+    return thread
+
+@app.cli.command('archive-orders')
+def archive_orders_command():
+    """Move old finished orders to archive.db now"""
+    print(f"Archived {archive_orders()} order(s)")
+
+# ============================================================================
+# CUSTOMERS
+# ============================================================================
+
+def normalize_whatsapp(raw):
+    """Normalize a free-text WhatsApp number to E.164 (+62812...), or None"""
+    if not raw:
+        return None
+    raw = raw.strip()
+    digits = ''.join(ch for ch in raw if ch.isdigit())
+    if raw.startswith('+'):
+        pass
+    elif digits.startswith('00'):
+        digits = digits[2:]
+    elif digits.startswith('0'):
+        digits = DEFAULT_COUNTRY_CODE + digits[1:]
+    elif digits.startswith('8'):
+        # Local mobile number typed without the leading 0
+        digits = DEFAULT_COUNTRY_CODE + digits
+    if not 8 <= len(digits) <= 15 or digits.startswith('0'):
+        return None
+    return f'+{digits}'
+
+def record_customer_order(c, phone, name, email, quantity):
+    """Upsert the customer row and bump its lifetime totals (new orders are never 'batal')"""
+    c.execute('''
+        INSERT INTO customers (phone, name, email, first_order_at, last_order_at, order_count, total_quantity)
+        VALUES (?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, 1, ?)
+        ON CONFLICT(phone) DO UPDATE SET
+            name = excluded.name,
+            email = COALESCE(NULLIF(excluded.email, ''), customers.email),
+            last_order_at = excluded.last_order_at,
+            order_count = customers.order_count + 1,
+            total_quantity = customers.total_quantity + excluded.total_quantity
+    ''', (phone, name, email or None, quantity))
+
+def backfill_customers(batch_size=1000):
+    """Tag existing orders with customer_phone, then rebuild the customers table
+    from every order (hot and archived). Returns the number of customers."""
+    conn = get_db()
+    try:
+        c = conn.cursor()
+        last_id = 0
+        while True:
+            rows = c.execute('''
+                SELECT id, whatsapp FROM orders
+                WHERE customer_phone IS NULL AND id > ?
+                ORDER BY id LIMIT ?
+            ''', (last_id, batch_size)).fetchall()
+            if not rows:
+                break
+            c.executemany(
+                'UPDATE orders SET customer_phone = ? WHERE id = ?',
+                [(normalize_whatsapp(r['whatsapp']), r['id']) for r in rows]
+            )
+            conn.commit()
+            last_id = rows[-1]['id']
+
+        sources = ['SELECT customer_phone, customer_name, email, quantity, status, created_at FROM main.orders']
+        if os.path.exists(ARCHIVE_DATABASE):
+            attach_archive(conn, writable=True)
+            last_id = 0
+            while True:
+                rows = c.execute('''
+                    SELECT id, whatsapp FROM archive.orders
+                    WHERE customer_phone IS NULL AND id > ?
+                    ORDER BY id LIMIT ?
+                ''', (last_id, batch_size)).fetchall()
+                if not rows:
+                    break
+                c.executemany(
+                    'UPDATE archive.orders SET customer_phone = ? WHERE id = ?',
+                    [(normalize_whatsapp(r['whatsapp']), r['id']) for r in rows]
+                )
+                conn.commit()
+                last_id = rows[-1]['id']
+            sources.append('SELECT customer_phone, customer_name, email, quantity, status, created_at FROM archive.orders')
+
+        # Recompute in one write transaction so concurrent create_order upserts are not lost
+        c.execute('BEGIN IMMEDIATE')
+        c.execute('DELETE FROM main.customers')
+        c.execute(f'''
+            WITH all_orders AS ({' UNION ALL '.join(sources)}),
+            firsts AS (
+                SELECT customer_phone, MIN(created_at) AS first_order_at
+                FROM all_orders WHERE customer_phone IS NOT NULL
+                GROUP BY customer_phone
+            ),
+            emails AS (
+                -- same rule as record_customer_order: newest non-empty email wins
+                SELECT customer_phone, email, MAX(created_at)
+                FROM all_orders WHERE customer_phone IS NOT NULL AND NULLIF(email, '') IS NOT NULL
+                GROUP BY customer_phone
+            )
+            INSERT INTO main.customers (phone, name, email, first_order_at, last_order_at, order_count, total_quantity)
+            SELECT latest.customer_phone, latest.customer_name, emails.email, firsts.first_order_at,
+                   latest.last_order_at, latest.order_count, latest.total_quantity
+            FROM (
+                -- bare columns come from the row holding MAX(created_at)
+                SELECT customer_phone, customer_name, MAX(created_at) AS last_order_at,
+                       SUM(CASE WHEN status = 'batal' THEN 0 ELSE 1 END) AS order_count,
+                       SUM(CASE WHEN status = 'batal' THEN 0 ELSE quantity END) AS total_quantity
+                FROM all_orders WHERE customer_phone IS NOT NULL
+                GROUP BY customer_phone
+            ) AS latest
+            JOIN firsts ON firsts.customer_phone = latest.customer_phone
+            LEFT JOIN emails ON emails.customer_phone = latest.customer_phone
+        ''')
+        c.execute("INSERT OR REPLACE INTO main.app_meta (key, value) VALUES (?, ?)",
+                  (CUSTOMERS_BACKFILL_KEY, datetime.utcnow().isoformat()))
+        conn.commit()
+        return c.execute('SELECT COUNT(*) FROM main.customers').fetchone()[0]
+    finally:
+        conn.close()
+
+def start_customer_backfill():
+    """Run backfill_customers once in the background if it has never completed"""
+    conn = get_db()
+    try:
+        done = conn.execute('SELECT 1 FROM app_meta WHERE key = ?', (CUSTOMERS_BACKFILL_KEY,)).fetchone()
+    finally:
+        conn.close()
+    if done:
+        return None
+
+    def worker():
+        try:
+            print(f"👥 Indeks pelanggan dibuat: {backfill_customers()} pelanggan")
+        except Exception as e:
+            print(f"⚠️ Backfill pelanggan gagal: {e}")
+    thread = threading.Thread(target=worker, name='customer-backfill', daemon=True)
+    thread.start()
+    return thread
+
+@app.cli.command('backfill-customers')
+def backfill_customers_command():
+    """Rebuild the customers table from all orders"""
+    print(f"Indexed {backfill_customers()} customer(s)")
+
 # ============================================================================
 # API ROUTES
 # ============================================================================
@@ -381,6 +1158,279 @@ def login():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# ============================================================================
+# CHUNKED UPLOADS
+# ============================================================================
+
+# Multipart 'image'/'logo' fields on the product and company routes stay for
+# existing clients; js/admin.js talks to the Vercel API, not this server.
+# Per-upload lock and running SHA-256 so finalize does not re-read the file
+_upload_states = {}
+_upload_states_lock = threading.Lock()
+
+def detect_image_type(head):
+    """Identify an image format from its first bytes"""
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    for kind, signatures in IMAGE_SIGNATURES.items():
+        if any(head.startswith(sig) for sig in signatures):
+            return kind
+    return None
+
+def upload_tmp_path(upload_id):
+    return os.path.join(UPLOAD_TMP_FOLDER, f'{upload_id}.part')
+
+def get_upload_state(upload_id):
+    with _upload_states_lock:
+        state = _upload_states.get(upload_id)
+        if state is None:
+            state = {'lock': threading.Lock(), 'hasher': hashlib.sha256(), 'hashed': 0}
+            _upload_states[upload_id] = state
+        return state
+
+def drop_upload_state(upload_id):
+    with _upload_states_lock:
+        _upload_states.pop(upload_id, None)
+
+def consume_upload(c, upload_id):
+    """Return the image path of a finalized upload and release the upload row"""
+    row = c.execute(
+        "SELECT image_path FROM uploads WHERE id = ? AND admin_id = ? AND status = 'done'",
+        (upload_id, request.admin_id)
+    ).fetchone()
+    if not row:
+        return None
+    c.execute('DELETE FROM uploads WHERE id = ?', (upload_id,))
+    return row['image_path']
+
+def purge_stale_uploads(c):
+    """Delete uploads (and their temp files) untouched for longer than UPLOAD_TTL"""
+    cutoff = (datetime.utcnow() - UPLOAD_TTL).isoformat()
+    stale = c.execute('SELECT id FROM uploads WHERE updated_at < ?', (cutoff,)).fetchall()
+    for row in stale:
+        try:
+            os.remove(upload_tmp_path(row['id']))
+        except FileNotFoundError:
+            pass
+        drop_upload_state(row['id'])
+    c.execute('DELETE FROM uploads WHERE updated_at < ?', (cutoff,))
+
+def read_exact(stream, size):
+    """Read up to size bytes, tolerating short reads from the socket"""
+    data = b''
+    while len(data) < size:
+        block = stream.read(size - len(data))
+        if not block:
+            break
+        data += block
+    return data
+
+@app.route('/api/uploads', methods=['POST'])
+@require_auth
+def init_upload():
+    """Start a chunked image upload"""
+    try:
+        data = request.get_json() or {}
+        filename = data.get('filename', '').strip()
+        kind = data.get('kind', 'product')
+        total_size = data.get('size')
+
+        if not filename or not allowed_file(filename):
+            return jsonify({'error': 'Format file tidak didukung'}), 400
+        if kind not in ['product', 'logo']:
+            return jsonify({'error': 'Jenis upload tidak valid'}), 400
+        if total_size is not None and (isinstance(total_size, bool) or not isinstance(total_size, int) or total_size <= 0):
+            return jsonify({'error': 'Ukuran file tidak valid'}), 400
+        if total_size and total_size > MAX_IMAGE_SIZE:
+            return jsonify({'error': 'File terlalu besar'}), 413
+
+        upload_id = secrets.token_hex(16)
+        now = datetime.utcnow().isoformat()
+        open(upload_tmp_path(upload_id), 'wb').close()
+
+        conn = get_db()
+        c = conn.cursor()
+        c.execute('''
+            INSERT INTO uploads (id, admin_id, kind, ext, total_size, received, status, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, 0, 'pending', ?, ?)
+        ''', (upload_id, request.admin_id, kind, filename.rsplit('.', 1)[1].lower(), total_size, now, now))
+        conn.commit()
+        conn.close()
+
+        return jsonify({'success': True, 'upload_id': upload_id, 'received': 0, 'max_size': MAX_IMAGE_SIZE}), 201
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+@require_auth
+def get_upload(upload_id):
+    """Upload progress, used by clients to resume after a dropped connection"""
+    try:
+        conn = get_db()
+        c = conn.cursor()
+        row = c.execute(
+            'SELECT received, total_size, status, image_path FROM uploads WHERE id = ? AND admin_id = ?',
+            (upload_id, request.admin_id)
+        ).fetchone()
+        conn.close()
+        if not row:
+            return jsonify({'error': 'Upload tidak ditemukan'}), 404
+        return jsonify({
+            'success': True,
+            'upload_id': upload_id,
+            'received': row['received'],
+            'total_size': row['total_size'],
+            'status': row['status'],
+            'image_path': row['image_path']
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/uploads/<upload_id>', methods=['PUT'])
+@require_auth
+def append_upload_chunk(upload_id):
+    """Append a raw chunk at ?offset=N (must equal the bytes received so far)"""
+    try:
+        offset = request.args.get('offset', type=int)
+        if offset is None:
+            return jsonify({'error': 'Parameter offset wajib diisi'}), 400
+
+        conn = get_db()
+        try:
+            c = conn.cursor()
+            upload = c.execute(
+                'SELECT ext, total_size, received, status FROM uploads WHERE id = ? AND admin_id = ?',
+                (upload_id, request.admin_id)
+            ).fetchone()
+            if not upload:
+                return jsonify({'error': 'Upload tidak ditemukan'}), 404
+            if upload['status'] != 'pending':
+                return jsonify({'error': 'Upload sudah selesai'}), 409
+
+            state = get_upload_state(upload_id)
+            if not state['lock'].acquire(blocking=False):
+                return jsonify({'error': 'Chunk lain sedang diproses', 'received': upload['received']}), 409
+            try:
+                # Re-read under the lock: a concurrent finalize may have completed it
+                current = c.execute('SELECT received, status FROM uploads WHERE id = ?', (upload_id,)).fetchone()
+                if not current or current['status'] != 'pending':
+                    return jsonify({'error': 'Upload sudah selesai'}), 409
+                received = current['received']
+                if offset != received:
+                    return jsonify({'error': 'Offset tidak sesuai', 'received': received}), 409
+
+                limit = min(MAX_IMAGE_SIZE, upload['total_size'] or MAX_IMAGE_SIZE)
+                hasher = state['hasher'].copy() if state['hashed'] == received else None
+                written = 0
+
+                limit_reply = jsonify({'error': 'File terlalu besar', 'received': received}), 413
+                if request.content_length is not None and received + request.content_length > limit:
+                    return limit_reply
+                try:
+                    with open(upload_tmp_path(upload_id), 'r+b') as out:
+                        # Discard bytes left over from a chunk that was cut off mid-transfer
+                        out.seek(received)
+                        out.truncate()
+
+                        if received < IMAGE_SIGNATURE_BYTES:
+                            # Signature may span several small chunks; check once it is complete
+                            out.seek(0)
+                            stored = out.read(received)
+                            head = read_exact(request.stream, IMAGE_SIGNATURE_BYTES - received)
+                            if len(stored + head) == IMAGE_SIGNATURE_BYTES:
+                                expected = 'jpeg' if upload['ext'] in ['jpg', 'jpeg'] else upload['ext']
+                                if detect_image_type(stored + head) != expected:
+                                    return jsonify({'error': 'Isi file bukan gambar yang valid'}), 415
+                            out.write(head)
+                            if hasher:
+                                hasher.update(head)
+                            written += len(head)
+
+                        for block in iter(lambda: request.stream.read(64 * 1024), b''):
+                            if received + written + len(block) > limit:
+                                out.seek(received)
+                                out.truncate()
+                                return limit_reply
+                            out.write(block)
+                            if hasher:
+                                hasher.update(block)
+                            written += len(block)
+                except RequestEntityTooLarge:
+                    # Chunk without Content-Length ran past MAX_CONTENT_LENGTH mid-read
+                    os.truncate(upload_tmp_path(upload_id), received)
+                    return limit_reply
+
+                received += written
+                if hasher:
+                    state['hasher'] = hasher
+                    state['hashed'] = received
+                c.execute(
+                    'UPDATE uploads SET received = ?, updated_at = ? WHERE id = ?',
+                    (received, datetime.utcnow().isoformat(), upload_id)
+                )
+                conn.commit()
+            finally:
+                state['lock'].release()
+        finally:
+            conn.close()
+
+        return jsonify({'success': True, 'upload_id': upload_id, 'received': received}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/uploads/<upload_id>/finalize', methods=['POST'])
+@require_auth
+def finalize_upload(upload_id):
+    """Move a completed upload into the image store"""
+    try:
+        conn = get_db()
+        try:
+            c = conn.cursor()
+            owned = c.execute(
+                'SELECT id FROM uploads WHERE id = ? AND admin_id = ?', (upload_id, request.admin_id)
+            ).fetchone()
+            if not owned:
+                return jsonify({'error': 'Upload tidak ditemukan'}), 404
+
+            state = get_upload_state(upload_id)
+            with state['lock']:
+                # Re-read under the lock so concurrent finalize calls see each other's result
+                upload = c.execute(
+                    'SELECT kind, ext, total_size, received, status, image_path FROM uploads WHERE id = ?',
+                    (upload_id,)
+                ).fetchone()
+                if not upload or upload['status'] == 'done':
+                    drop_upload_state(upload_id)
+                    if not upload:
+                        return jsonify({'error': 'Upload tidak ditemukan'}), 404
+                    return jsonify({'success': True, 'upload_id': upload_id, 'image_path': upload['image_path']}), 200
+                if upload['received'] == 0:
+                    return jsonify({'error': 'Belum ada data yang diupload'}), 400
+                if upload['received'] < IMAGE_SIGNATURE_BYTES:
+                    return jsonify({'error': 'Isi file bukan gambar yang valid'}), 415
+                if upload['total_size'] and upload['received'] != upload['total_size']:
+                    return jsonify({'error': 'Upload belum lengkap', 'received': upload['received']}), 409
+
+                tmp_path = upload_tmp_path(upload_id)
+                if state['hashed'] == upload['received']:
+                    digest = state['hasher'].hexdigest()
+                else:
+                    # Server restarted mid-upload; hash state was lost
+                    digest = file_sha256(tmp_path)
+                image_path = store_image_file(c, tmp_path, digest, upload['received'], upload['ext'], upload['kind'])
+                c.execute(
+                    "UPDATE uploads SET status = 'done', image_path = ?, updated_at = ? WHERE id = ?",
+                    (image_path, datetime.utcnow().isoformat(), upload_id)
+                )
+                conn.commit()
+            drop_upload_state(upload_id)
+        finally:
+            conn.close()
+
+        return jsonify({'success': True, 'upload_id': upload_id, 'image_path': image_path}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # ============================================================================
 # PRODUCTS CRUD
 # ============================================================================
@@ -464,31 +1514,34 @@ def create_product():
         if not name:
             return jsonify({'error': 'Nama produk harus diisi'}), 400
         
-        image_path = '/images/default.jpg'
-        
-        # Handle file upload
-        if 'image' in request.files:
-            file = request.files['image']
-            if file and file.filename and allowed_file(file.filename):
-                # Generate unique filename
-                ext = file.filename.rsplit('.', 1)[1].lower()
-                filename = f"product_{int(datetime.now().timestamp())}_{secrets.token_hex(4)}.{ext}"
-                filepath = os.path.join(UPLOAD_FOLDER, filename)
-                file.save(filepath)
-                image_path = f'/images/{filename}'
+        image_path = DEFAULT_PRODUCT_IMAGE
         
         conn = get_db()
         c = conn.cursor()
-        
+
+        # Prefer a finalized chunked upload; multipart 'image' is still accepted
+        upload_id = request.form.get('upload_id', '').strip()
+        if upload_id:
+            image_path = consume_upload(c, upload_id)
+            if not image_path:
+                conn.close()
+                return jsonify({'error': 'Upload tidak ditemukan atau belum selesai'}), 400
+        elif 'image' in request.files:
+            file = request.files['image']
+            if file and file.filename and allowed_file(file.filename):
+                image_path = store_image(c, file, 'product')
+
         c.execute('''
             INSERT INTO products (name, description, image_path, price, stock, available)
             VALUES (?, ?, ?, ?, ?, ?)
         ''', (name, description, image_path, price, stock, available))
-        
-        conn.commit()
         product_id = c.lastrowid
+
+        conn.commit()
         conn.close()
-        
+
+        schedule_translation_refresh('product', product_id, {'name': name, 'description': description})
+
         return jsonify({
             'success': True,
             'message': 'Produk berhasil ditambahkan',
@@ -504,53 +1557,58 @@ def create_product():
 def update_product(product_id):
     """Update product"""
     try:
-        conn = get_db()
-        c = conn.cursor()
-        
-        # Check if product exists
-        product = c.execute('SELECT id FROM products WHERE id = ?', (product_id,)).fetchone()
-        if not product:
-            return jsonify({'error': 'Produk tidak ditemukan'}), 404
-        
         name = request.form.get('name', '').strip()
         description = request.form.get('description', '').strip()
         price = request.form.get('price', type=float)
         stock = request.form.get('stock', type=int)
         available = request.form.get('available', 'true') == 'true'
-        
+
         if not name:
             return jsonify({'error': 'Nama produk harus diisi'}), 400
-        
-        # Get existing image
-        existing = c.execute('SELECT image_path FROM products WHERE id = ?', (product_id,)).fetchone()
-        image_path = existing['image_path']
-        
-        # Handle new image upload
-        if 'image' in request.files:
+
+        # Copy and hash a multipart image before any write lock is taken
+        upload_id = request.form.get('upload_id', '').strip()
+        spooled = None
+        if not upload_id and 'image' in request.files:
             file = request.files['image']
             if file and file.filename and allowed_file(file.filename):
-                ext = file.filename.rsplit('.', 1)[1].lower()
-                filename = f"product_{int(datetime.now().timestamp())}_{secrets.token_hex(4)}.{ext}"
-                filepath = os.path.join(UPLOAD_FOLDER, filename)
-                file.save(filepath)
-                image_path = f'/images/{filename}'
-        
-        c.execute('''
-            UPDATE products 
-            SET name = ?, description = ?, image_path = ?, price = ?, stock = ?, 
-                available = ?, updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        ''', (name, description, image_path, price, stock, available, product_id))
-        
-        conn.commit()
-        conn.close()
-        
+                spooled = spool_image(file)
+
+        try:
+            with repository.connection(DATABASE) as conn:
+                c = conn.cursor()
+
+                # Handle new image (the replaced file is left to the image GC).
+                # Only once the product is known to exist, so a 404 stores nothing.
+                image_path = None
+                if upload_id or spooled:
+                    if not repository.product_exists(conn, product_id):
+                        return jsonify({'error': 'Produk tidak ditemukan'}), 404
+                    if upload_id:
+                        image_path = consume_upload(c, upload_id)
+                        if not image_path:
+                            conn.rollback()
+                            return jsonify({'error': 'Upload tidak ditemukan atau belum selesai'}), 400
+                    else:
+                        image_path = store_image_file(c, *spooled, 'product')
+
+                updated = repository.update_product(conn, product_id, name, description, image_path, price, stock, available)
+                if not updated:
+                    # Deleted since the check; a file stored meanwhile is left to the image GC
+                    conn.rollback()
+                    return jsonify({'error': 'Produk tidak ditemukan'}), 404
+        finally:
+            if spooled and os.path.exists(spooled[0]):
+                os.remove(spooled[0])
+
+        schedule_translation_refresh('product', product_id, {'name': name, 'description': description})
+
         return jsonify({
             'success': True,
             'message': 'Produk berhasil diupdate',
-            'image_path': image_path
+            'image_path': updated['image_path']
         }), 200
-    
+
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -559,18 +1617,13 @@ def update_product(product_id):
 def delete_product(product_id):
     """Delete product"""
     try:
-        conn = get_db()
-        c = conn.cursor()
-        
-        # Check if exists
-        product = c.execute('SELECT id FROM products WHERE id = ?', (product_id,)).fetchone()
-        if not product:
+        with repository.connection(DATABASE) as conn:
+            deleted = repository.delete_product(conn, product_id)
+        if not deleted:
             return jsonify({'error': 'Produk tidak ditemukan'}), 404
-        
-        c.execute('DELETE FROM products WHERE id = ?', (product_id,))
-        conn.commit()
-        conn.close()
-        
+
+        schedule_translation_refresh('product', product_id, None)
+
         return jsonify({
             'success': True,
             'message': 'Produk berhasil dihapus'
@@ -584,23 +1637,11 @@ def delete_product(product_id):
 def toggle_availability(product_id):
     """Toggle product availability"""
     try:
-        conn = get_db()
-        c = conn.cursor()
-        
-        # Get current status
-        product = c.execute('SELECT available FROM products WHERE id = ?', (product_id,)).fetchone()
-        if not product:
+        with repository.connection(DATABASE) as conn:
+            new_status = repository.toggle_product_availability(conn, product_id)
+        if new_status is None:
             return jsonify({'error': 'Produk tidak ditemukan'}), 404
-        
-        new_status = not bool(product['available'])
-        
-        c.execute(
-            'UPDATE products SET available = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
-            (new_status, product_id)
-        )
-        conn.commit()
-        conn.close()
-        
+
         return jsonify({
             'success': True,
             'message': f'Produk {"diaktifkan" if new_status else "dinonaktifkan"}',
@@ -620,21 +1661,12 @@ def update_stock(product_id):
         
         if stock is None or stock < 0:
             return jsonify({'error': 'Stok harus angka positif'}), 400
-        
-        conn = get_db()
-        c = conn.cursor()
-        
-        product = c.execute('SELECT id FROM products WHERE id = ?', (product_id,)).fetchone()
-        if not product:
+
+        with repository.connection(DATABASE) as conn:
+            updated = repository.update_product_stock(conn, product_id, stock)
+        if not updated:
             return jsonify({'error': 'Produk tidak ditemukan'}), 404
-        
-        c.execute(
-            'UPDATE products SET stock = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
-            (stock, product_id)
-        )
-        conn.commit()
-        conn.close()
-        
+
         return jsonify({
             'success': True,
             'message': 'Stok berhasil diupdate',
@@ -696,29 +1728,37 @@ def update_company():
         
         # Get existing logo
         existing = c.execute('SELECT logo_path FROM company WHERE id = 1').fetchone()
-        logo_path = existing['logo_path'] if existing else '/images/logo.png'
+        logo_path = existing['logo_path'] if existing else DEFAULT_COMPANY_LOGO
         
         # Handle logo upload
-        if 'logo' in request.files:
+        upload_id = request.form.get('upload_id', '').strip()
+        if upload_id:
+            logo_path = consume_upload(c, upload_id)
+            if not logo_path:
+                conn.close()
+                return jsonify({'error': 'Upload tidak ditemukan atau belum selesai'}), 400
+        elif 'logo' in request.files:
             file = request.files['logo']
             if file and file.filename and allowed_file(file.filename):
-                ext = file.filename.rsplit('.', 1)[1].lower()
-                filename = f"logo_{int(datetime.now().timestamp())}.{ext}"
-                filepath = os.path.join(UPLOAD_FOLDER, filename)
-                file.save(filepath)
-                logo_path = f'/images/{filename}'
-        
+                logo_path = store_image(c, file, 'logo')
+
         # Update company info
         c.execute('''
-            UPDATE company 
-            SET name = ?, description = ?, phone = ?, whatsapp = ?, email = ?, 
+            UPDATE company
+            SET name = ?, description = ?, phone = ?, whatsapp = ?, email = ?,
                 address = ?, operating_hours = ?, logo_path = ?, updated_at = CURRENT_TIMESTAMP
             WHERE id = 1
         ''', (name, description, phone, whatsapp, email, address, operating_hours, logo_path))
-        
+
         conn.commit()
         conn.close()
-        
+
+        schedule_translation_refresh('company', 1, {
+            'name': name,
+            'description': description,
+            'operating_hours': operating_hours
+        })
+
         return jsonify({
             'success': True,
             'message': 'Informasi perusahaan berhasil diupdate',
@@ -728,13 +1768,223 @@ def update_company():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# ============================================================================
+# TRANSLATION
+# ============================================================================
+
+def text_hash(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+def stub_translate(texts, source, target):
+    """Local backend for tests and offline development"""
+    return [f'[{target}] {text}' for text in texts]
+
+def mymemory_translate(texts, source, target):
+    """MyMemory has no batch API; translate one string per request.
+    Failed strings (and those left when TRANSLATE_BACKEND_BUDGET runs out)
+    come back as None and are not cached."""
+    results = []
+    deadline = time.monotonic() + TRANSLATE_BACKEND_BUDGET
+    for text in texts:
+        if time.monotonic() >= deadline:
+            results.append(None)
+            continue
+        query = urllib.parse.urlencode({'q': text, 'langpair': f'{source}|{target}'})
+        try:
+            with urllib.request.urlopen(f'https://api.mymemory.translated.net/get?{query}', timeout=TRANSLATE_TIMEOUT) as resp:
+                data = json.loads(resp.read().decode('utf-8'))
+            if data.get('responseStatus') == 200 and (data.get('responseData') or {}).get('translatedText'):
+                results.append(data['responseData']['translatedText'])
+            else:
+                results.append(None)
+        except Exception as e:
+            print(f"⚠️ Terjemahan gagal: {e}")
+            results.append(None)
+    return results
+
+TRANSLATION_BACKENDS = {
+    'mymemory': mymemory_translate,
+    'stub': stub_translate,
+}
+
+def translate_texts(texts, source, target, max_misses=None, catalogue_only=False):
+    """Translate a list of strings through the translation memory.
+    max_misses caps the strings sent to the backend (the rest fall back to
+    the original text); catalogue_only stores only text listed in
+    translation_sources. Returns (translations aligned with texts, cache hits,
+    number of distinct texts left untranslated)."""
+    unique = list(dict.fromkeys(texts))
+    hashes = {text: text_hash(text) for text in unique}
+    found = {}
+    with repository.connection(DATABASE) as conn:
+        for start in range(0, len(unique), TRANSLATE_MAX_BATCH):
+            chunk = [hashes[text] for text in unique[start:start + TRANSLATE_MAX_BATCH]]
+            placeholders = ','.join('?' * len(chunk))
+            for row in conn.execute(f'''
+                SELECT text_hash, translated FROM translations
+                WHERE source = ? AND target = ? AND text_hash IN ({placeholders})
+            ''', [source, target] + chunk).fetchall():
+                found[row['text_hash']] = row['translated']
+
+    hits = len(found)
+    misses = [text for text in unique if hashes[text] not in found][:max_misses]
+    if misses:
+        backend = TRANSLATION_BACKENDS[TRANSLATION_BACKEND]
+        translated = backend(misses, source, target)
+        results = [(hashes[text], result) for text, result in zip(misses, translated) if result is not None]
+        for text_hash_value, result in results:
+            found[text_hash_value] = result
+        with repository.connection(DATABASE) as conn:
+            if catalogue_only and results:
+                placeholders = ','.join('?' * len(results))
+                known = {row['text_hash'] for row in conn.execute(
+                    f'SELECT text_hash FROM translation_sources WHERE text_hash IN ({placeholders})',
+                    [h for h, _ in results]
+                ).fetchall()}
+                results = [(h, result) for h, result in results if h in known]
+            if results:
+                conn.executemany('''
+                    INSERT OR REPLACE INTO translations (text_hash, source, target, translated)
+                    VALUES (?, ?, ?, ?)
+                ''', [(h, source, target, result) for h, result in results])
+
+    # Untranslated strings fall back to the original text
+    untranslated = sum(1 for text in unique if hashes[text] not in found)
+    return [found.get(hashes[text], text) for text in texts], hits, untranslated
+
+def refresh_entity_translations(owner_type, owner_id, fields):
+    """Drop translations of text a product/company no longer uses and
+    precompute its current text. Fields whose translation is missing (e.g.
+    the backend failed last time) are retried even if the text is unchanged.
+    fields=None means the row was deleted."""
+    stale = []
+    with repository.connection(DATABASE) as conn:
+        current = {row['field']: row['text_hash'] for row in conn.execute(
+            'SELECT field, text_hash FROM translation_sources WHERE owner_type = ? AND owner_id = ?',
+            (owner_type, owner_id)
+        ).fetchall()}
+        for field, old_hash in current.items():
+            if fields is None or not fields.get(field) or text_hash(fields[field]) != old_hash:
+                stale.append(old_hash)
+                conn.execute(
+                    'DELETE FROM translation_sources WHERE owner_type = ? AND owner_id = ? AND field = ?',
+                    (owner_type, owner_id, field)
+                )
+        for field, text in (fields or {}).items():
+            if text and current.get(field) != text_hash(text):
+                conn.execute('''
+                    INSERT OR REPLACE INTO translation_sources (owner_type, owner_id, field, text_hash)
+                    VALUES (?, ?, ?, ?)
+                ''', (owner_type, owner_id, field, text_hash(text)))
+        for old_hash in stale:
+            conn.execute('''
+                DELETE FROM translations
+                WHERE text_hash = ? AND NOT EXISTS (SELECT 1 FROM translation_sources WHERE text_hash = ?)
+            ''', (old_hash, old_hash))
+
+    texts = [text for text in (fields or {}).values() if text]
+    if texts:
+        # translate_texts only sends what the memory does not have yet
+        for target in TRANSLATION_TARGETS:
+            translate_texts(texts, TRANSLATION_SOURCE, target)
+
+_translation_queue = queue.Queue()
+_translation_worker = None
+_translation_worker_lock = threading.Lock()
+
+def schedule_translation_refresh(owner_type, owner_id, fields):
+    """Queue refresh_entity_translations on a background worker so the
+    admin request does not wait for the remote translation service"""
+    global _translation_worker
+    with _translation_worker_lock:
+        if _translation_worker is None:
+            def worker():
+                while True:
+                    job = _translation_queue.get()
+                    try:
+                        refresh_entity_translations(*job)
+                    except Exception as e:
+                        print(f"⚠️ Precompute terjemahan gagal: {e}")
+                    finally:
+                        _translation_queue.task_done()
+            _translation_worker = threading.Thread(target=worker, name='translation', daemon=True)
+            _translation_worker.start()
+    _translation_queue.put((owner_type, owner_id, fields))
+
+@app.cli.command('precompute-translations')
+def precompute_translations_command():
+    """Fill the translation memory for every product and the company profile"""
+    conn = get_db()
+    try:
+        products = conn.execute('SELECT id, name, description FROM products').fetchall()
+        company = conn.execute('SELECT name, description, operating_hours FROM company WHERE id = 1').fetchone()
+    finally:
+        conn.close()
+    for p in products:
+        refresh_entity_translations('product', p['id'], {'name': p['name'], 'description': p['description']})
+    if company:
+        refresh_entity_translations('company', 1, dict(company))
+    print(f"Precomputed translations for {len(products)} product(s) and company profile")
+
+@app.route('/api/translate', methods=['POST'])
+def translate():
+    """Translate {text} or a batch {texts: [...]} (default id -> en).
+    Served from the translation memory; only misses reach the backend, at
+    most TRANSLATE_MAX_MISSES per request. Untranslated strings come back
+    unchanged and are counted in 'untranslated'."""
+    try:
+        data = request.get_json() or {}
+        source = data.get('source', TRANSLATION_SOURCE)
+        target = data.get('target', 'en')
+        single = 'texts' not in data
+        texts = [data.get('text')] if single else data.get('texts')
+
+        if not isinstance(texts, list) or not texts or len(texts) > TRANSLATE_MAX_BATCH:
+            return jsonify({'error': f'Kirim text atau texts (maksimal {TRANSLATE_MAX_BATCH})'}), 400
+        if not all(isinstance(t, str) and t.strip() and len(t) <= TRANSLATE_MAX_CHARS for t in texts):
+            return jsonify({'error': 'Teks kosong atau terlalu panjang'}), 400
+        if sum(len(t) for t in texts) > TRANSLATE_MAX_BATCH_CHARS:
+            return jsonify({'error': f'Total teks maksimal {TRANSLATE_MAX_BATCH_CHARS} karakter'}), 400
+        if not LANGUAGE_PATTERN.match(str(source)) or not LANGUAGE_PATTERN.match(str(target)):
+            return jsonify({'error': 'Kode bahasa tidak valid'}), 400
+
+        texts = [t.strip() for t in texts]
+        if source == target:
+            translations, hits, untranslated = texts, len(set(texts)), 0
+        else:
+            # Signed-in admins may store drafts; anonymous callers only catalogue text
+            token = request.headers.get('Authorization', '').strip()
+            session = find_active_session(token) if token else None
+            is_admin = bool(session and not session['expired'])
+            translations, hits, untranslated = translate_texts(
+                texts, source, target, max_misses=TRANSLATE_MAX_MISSES, catalogue_only=not is_admin
+            )
+
+        if single:
+            return jsonify({
+                'success': True,
+                'translatedText': translations[0],
+                'source': source,
+                'target': target
+            }), 200
+        return jsonify({
+            'success': True,
+            'translations': translations,
+            'source': source,
+            'target': target,
+            'cache_hits': hits,
+            'untranslated': untranslated
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # ============================================================================
 # ORDERS
 # ============================================================================
 
 @app.route('/api/orders', methods=['POST'])
 def create_order():
-    """Public endpoint to create order"""
+    """Public endpoint to create order (idempotent on client retries)"""
     try:
         data = request.get_json() or {}
         customer_name = data.get('customer_name', '').strip()
@@ -748,32 +1998,113 @@ def create_order():
         if not all([customer_name, whatsapp, product, quantity, address]):
             return jsonify({'error': 'Nama, WhatsApp, produk, jumlah, dan alamat wajib diisi'}), 400
 
+        # Explicit key wins; otherwise dedupe identical submissions within the window
+        request_hash = order_fingerprint(customer_name, whatsapp, product, quantity)
+        client_key = request.headers.get('Idempotency-Key', '').strip()
+        if len(client_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            return jsonify({'error': f'Idempotency-Key maksimal {IDEMPOTENCY_KEY_MAX_LENGTH} karakter'}), 400
+        if client_key:
+            idem_key = f'key:{client_key}'
+            ttl = IDEMPOTENCY_KEY_TTL
+        else:
+            idem_key = f'fp:{request_hash}'
+            ttl = ORDER_DEDUPE_WINDOW
+
+        cached = idempotency_cache_get(idem_key)
+        if cached:
+            return replay_order_response(cached, request_hash)
+
         conn = get_db()
-        c = conn.cursor()
-        c.execute('''
-            INSERT INTO orders (customer_name, whatsapp, email, product, quantity, address, note, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?, 'baru')
-        ''', (customer_name, whatsapp, email, product, quantity, address, note))
-        conn.commit()
-        order_id = c.lastrowid
-        conn.close()
+        try:
+            c = conn.cursor()
+            # Take the write lock first so concurrent retries cannot both insert
+            c.execute('BEGIN IMMEDIATE')
+            existing = load_idempotency_record(c, idem_key)
+            if existing:
+                conn.rollback()
+                idempotency_cache_put(idem_key, existing)
+                return replay_order_response(existing, request_hash)
+
+            customer_phone = normalize_whatsapp(whatsapp)
+            c.execute('''
+                INSERT INTO orders (customer_name, whatsapp, email, product, quantity, address, note, status, customer_phone)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 'baru', ?)
+            ''', (customer_name, whatsapp, email, product, quantity, address, note, customer_phone))
+            order_id = c.lastrowid
+            if customer_phone:
+                record_customer_order(c, customer_phone, customer_name, email, quantity)
+
+            body = {'success': True, 'message': 'Pesanan tersimpan', 'order_id': order_id}
+            now = datetime.utcnow()
+            expires_at = (now + ttl).isoformat()
+            c.execute('DELETE FROM order_idempotency WHERE expires_at < ?', (now.isoformat(),))
+            c.execute('''
+                INSERT OR REPLACE INTO order_idempotency (idem_key, request_hash, order_id, status_code, response, expires_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (idem_key, request_hash, order_id, 201, json.dumps(body), expires_at))
+            conn.commit()
+        finally:
+            conn.close()
 
-        return jsonify({'success': True, 'message': 'Pesanan tersimpan', 'order_id': order_id}), 201
+        idempotency_cache_put(idem_key, {
+            'request_hash': request_hash,
+            'status_code': 201,
+            'response': body,
+            'expires_at': expires_at
+        })
+        return jsonify(body), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/orders', methods=['GET'])
 @require_auth
 def list_orders():
+    """List orders, optionally within ?from=YYYY-MM-DD&to=YYYY-MM-DD.
+    Without a range only live orders are listed (open orders plus finished
+    ones newer than ARCHIVE_AFTER); archived orders are read when a range
+    reaches them. archived_until tells clients how far the archive goes."""
     try:
+        date_from = request.args.get('from', '').strip() or None
+        date_to = request.args.get('to', '').strip() or None
+        for value in [date_from, date_to]:
+            if value:
+                try:
+                    datetime.strptime(value, '%Y-%m-%d')
+                except ValueError:
+                    return jsonify({'error': 'Format tanggal harus YYYY-MM-DD'}), 400
+
+        conditions = []
+        params = []
+        if date_from:
+            conditions.append('created_at >= ?')
+            params.append(date_from)
+        if date_to:
+            conditions.append("created_at < date(?, '+1 day')")
+            params.append(date_to)
+        where = ' AND '.join(conditions) or '1 = 1'
+
         conn = get_db()
-        c = conn.cursor()
-        rows = c.execute('''
-            SELECT id, customer_name, whatsapp, email, product, quantity, address, note, status, created_at, updated_at
-            FROM orders
-            ORDER BY created_at DESC
-        ''').fetchall()
-        conn.close()
+        try:
+            c = conn.cursor()
+            archived_until = archive_horizon(c)
+            if (date_from or date_to) and archive_reaches(c, date_from):
+                attach_archive(conn)
+                rows = c.execute(f'''
+                    SELECT {ORDER_COLUMNS} FROM main.orders WHERE {where}
+                    UNION ALL
+                    SELECT {ORDER_COLUMNS} FROM archive.orders a
+                    WHERE {where} AND NOT EXISTS (SELECT 1 FROM main.orders m WHERE m.id = a.id)
+                    ORDER BY created_at DESC
+                ''', params + params).fetchall()
+            else:
+                rows = c.execute(f'''
+                    SELECT {ORDER_COLUMNS}
+                    FROM orders
+                    WHERE {where}
+                    ORDER BY created_at DESC
+                ''', params).fetchall()
+        finally:
+            conn.close()
         data = []
         for r in rows:
             data.append({
@@ -789,7 +2120,65 @@ def list_orders():
                 'created_at': r['created_at'],
                 'updated_at': r['updated_at']
             })
-        return jsonify({'success': True, 'data': data}), 200
+        return jsonify({'success': True, 'data': data, 'archived_until': archived_until}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/customers', methods=['GET'])
+@require_auth
+def get_customer():
+    """Look up a customer by ?whatsapp= (any format) with orders and lifetime totals"""
+    try:
+        phone = normalize_whatsapp(request.args.get('whatsapp', ''))
+        if not phone:
+            return jsonify({'error': 'Nomor WhatsApp tidak valid'}), 400
+
+        conn = get_db()
+        try:
+            c = conn.cursor()
+            customer = c.execute('SELECT * FROM customers WHERE phone = ?', (phone,)).fetchone()
+            if not customer:
+                return jsonify({'error': 'Pelanggan tidak ditemukan'}), 404
+
+            if archive_reaches(c, customer['first_order_at']):
+                attach_archive(conn)
+                rows = c.execute(f'''
+                    SELECT {ORDER_COLUMNS} FROM main.orders WHERE customer_phone = ?
+                    UNION ALL
+                    SELECT {ORDER_COLUMNS} FROM archive.orders a
+                    WHERE customer_phone = ? AND NOT EXISTS (SELECT 1 FROM main.orders m WHERE m.id = a.id)
+                    ORDER BY created_at DESC
+                ''', (phone, phone)).fetchall()
+            else:
+                rows = c.execute(f'''
+                    SELECT {ORDER_COLUMNS} FROM orders
+                    WHERE customer_phone = ?
+                    ORDER BY created_at DESC
+                ''', (phone,)).fetchall()
+        finally:
+            conn.close()
+
+        return jsonify({
+            'success': True,
+            'data': {
+                'phone': customer['phone'],
+                'name': customer['name'],
+                'email': customer['email'],
+                'first_order_at': customer['first_order_at'],
+                'last_order_at': customer['last_order_at'],
+                'order_count': customer['order_count'],
+                'total_quantity': customer['total_quantity'],
+                'orders': [{
+                    'id': r['id'],
+                    'product': r['product'],
+                    'quantity': r['quantity'],
+                    'address': r['address'],
+                    'note': r['note'],
+                    'status': r['status'],
+                    'created_at': r['created_at']
+                } for r in rows]
+            }
+        }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -802,21 +2191,283 @@ def update_order_status(order_id):
         if status not in ['baru', 'proses', 'dikirim', 'selesai', 'batal']:
             return jsonify({'error': 'Status tidak valid'}), 400
 
-        conn = get_db()
-        c = conn.cursor()
-        exists = c.execute('SELECT id FROM orders WHERE id = ?', (order_id,)).fetchone()
-        if not exists:
-            conn.close()
+        with repository.connection(DATABASE) as conn:
+            updated = repository.update_order_status(conn, order_id, status)
+        if not updated:
             return jsonify({'error': 'Pesanan tidak ditemukan'}), 404
-        c.execute('''
-            UPDATE orders SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?
-        ''', (status, order_id))
-        conn.commit()
-        conn.close()
         return jsonify({'success': True, 'message': 'Status diperbarui', 'status': status}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# ============================================================================
+# BACKUPS
+# ============================================================================
+
+_backup_lock = threading.Lock()
+_backup_status = {'running': False, 'last': None}
+
+class _BackupRestarting(Exception):
+    """Raised from the backup progress callback to switch to a single-pass copy"""
+
+def copy_database(source, dest_path):
+    """Copy source with the online backup API in small steps.
+    Returns the number of restarts caused by concurrent writes."""
+    state = {'remaining': None, 'restarts': 0}
+
+    def progress(status, remaining, total):
+        # SQLite restarts the copy when another connection writes the source
+        if state['remaining'] is not None and remaining > state['remaining']:
+            state['restarts'] += 1
+        state['remaining'] = remaining
+        if state['restarts'] >= BACKUP_MAX_RESTARTS:
+            raise _BackupRestarting()
+        time.sleep(BACKUP_STEP_SLEEP)
+
+    src = sqlite3.connect(source)
+    try:
+        dst = sqlite3.connect(dest_path)
+        try:
+            try:
+                src.backup(dst, pages=BACKUP_PAGES_PER_STEP, progress=progress)
+            except _BackupRestarting:
+                # Writes keep invalidating the step copy; finish in one pass.
+                # Under WAL this holds only a read snapshot, so writers continue.
+                src.backup(dst, pages=-1)
+        finally:
+            dst.close()
+    finally:
+        src.close()
+    return state['restarts']
+
+def backup_database(source, prefix, stamp):
+    """Copy, integrity-check and gzip one database to <prefix>-<stamp>.db.gz"""
+    name = f'{prefix}-{stamp}.db.gz'
+    tmp_path = os.path.join(BACKUP_FOLDER, f'.{prefix}-{stamp}.db.tmp')
+    gz_tmp = os.path.join(BACKUP_FOLDER, f'.{name}.tmp')
+    try:
+        restarts = copy_database(source, tmp_path)
+
+        check = sqlite3.connect(tmp_path)
+        try:
+            result = check.execute('PRAGMA integrity_check').fetchone()[0]
+        finally:
+            check.close()
+        if result != 'ok':
+            raise RuntimeError(f'Integrity check gagal ({prefix}): {result}')
+
+        with open(tmp_path, 'rb') as f_in, gzip.open(gz_tmp, 'wb', compresslevel=6) as f_out:
+            shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+        os.replace(gz_tmp, os.path.join(BACKUP_FOLDER, name))
+    finally:
+        for leftover in (tmp_path, gz_tmp):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    return {'name': name, 'size': os.path.getsize(os.path.join(BACKUP_FOLDER, name)), 'restarts': restarts}
+
+def run_backup():
+    """Online backup of data.db and archive.db: copy, integrity-check, gzip,
+    rotate. Returns backup info (archive.db under 'archive')."""
+    started = time.perf_counter()
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    # data.db first: an order archived between the two copies then shows up
+    # in both (read-through skips the duplicate) instead of in neither
+    info = backup_database(DATABASE, 'data', stamp)
+    if os.path.exists(ARCHIVE_DATABASE):
+        info['archive'] = backup_database(ARCHIVE_DATABASE, 'archive', stamp)
+
+    for database in BACKUP_DATABASES:
+        for old in list_backups(database)[BACKUP_KEEP:]:
+            os.remove(os.path.join(BACKUP_FOLDER, old['name']))
+
+    return dict(info, duration_s=round(time.perf_counter() - started, 2), finished_at=datetime.utcnow().isoformat())
+
+def list_backups(database=None):
+    """Finished backups (of one database, or all of them), newest first"""
+    backups = []
+    for name in os.listdir(BACKUP_FOLDER):
+        prefix = name.split('-', 1)[0]
+        if prefix in BACKUP_DATABASES and (database is None or prefix == database) and name.endswith('.db.gz'):
+            filepath = os.path.join(BACKUP_FOLDER, name)
+            backups.append({'name': name, 'database': prefix, 'size': os.path.getsize(filepath)})
+    backups.sort(key=lambda b: (b['name'].split('-', 1)[1], b['database'] == 'data'), reverse=True)
+    return backups
+
+def start_backup():
+    """Run run_backup in a background thread. Returns False if one is already running."""
+    if not _backup_lock.acquire(blocking=False):
+        return False
+    _backup_status['running'] = True
+
+    def worker():
+        try:
+            _backup_status['last'] = dict(run_backup(), success=True)
+            print(f"💾 Backup selesai: {_backup_status['last']['name']}")
+        except Exception as e:
+            _backup_status['last'] = {'success': False, 'error': str(e), 'finished_at': datetime.utcnow().isoformat()}
+            print(f"⚠️ Backup gagal: {e}")
+        finally:
+            _backup_status['running'] = False
+            _backup_lock.release()
+
+    threading.Thread(target=worker, name='backup', daemon=True).start()
+    return True
+
+def start_backup_scheduler():
+    """Start a backup every BACKUP_INTERVAL seconds in a daemon thread"""
+    def loop():
+        while True:
+            time.sleep(BACKUP_INTERVAL)
+            start_backup()
+    thread = threading.Thread(target=loop, name='backup-scheduler', daemon=True)
+    thread.start()
+    return thread
+
+@app.route('/api/admin/backups', methods=['POST'])
+@require_auth
+def trigger_backup():
+    """Start an online backup of data.db and archive.db"""
+    if not start_backup():
+        return jsonify({'error': 'Backup sedang berjalan'}), 409
+    return jsonify({'success': True, 'message': 'Backup dimulai'}), 202
+
+@app.route('/api/admin/backups', methods=['GET'])
+@require_auth
+def get_backups():
+    """List backups and the status of the last run"""
+    try:
+        return jsonify({
+            'success': True,
+            'running': _backup_status['running'],
+            'last': _backup_status['last'],
+            'data': list_backups()
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.cli.command('backup')
+def backup_command():
+    """Run one online backup of data.db and archive.db in the foreground"""
+    info = run_backup()
+    print(f"Backup {info['name']}: {info['size']} bytes in {info['duration_s']}s ({info['restarts']} restart(s))")
+    if 'archive' in info:
+        print(f"Backup {info['archive']['name']}: {info['archive']['size']} bytes ({info['archive']['restarts']} restart(s))")
+
+# ============================================================================
+# REQUEST PROFILER
+# ============================================================================
+
+# cProfile allows one active profiler per process on Python 3.12+
+_profiler_lock = threading.Lock()
+PROFILE_ID_PATTERN = re.compile(r'^\d+_[0-9a-f]{6}$')
+
+def save_profile(profile_id, profiler, meta):
+    """Write pstats, a text summary and metadata; trim to the newest PROFILE_KEEP"""
+    base = os.path.join(PROFILE_FOLDER, profile_id)
+    profiler.dump_stats(f'{base}.prof')
+
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(40)
+    with open(f'{base}.txt', 'w') as f:
+        f.write(summary.getvalue())
+
+    with open(f'{base}.json', 'w') as f:
+        json.dump(dict(meta, id=profile_id, created_at=datetime.utcnow().isoformat()), f)
+
+    ids = sorted(name[:-5] for name in os.listdir(PROFILE_FOLDER) if name.endswith('.json'))
+    for old_id in ids[:-PROFILE_KEEP]:
+        for ext in ['json', 'prof', 'txt']:
+            try:
+                os.remove(os.path.join(PROFILE_FOLDER, f'{old_id}.{ext}'))
+            except FileNotFoundError:
+                pass
+
+def profile_requested(environ):
+    """True when X-Profile or the _profile query parameter holds a truthy value"""
+    if environ.get('HTTP_X_PROFILE', '').strip().lower() in PROFILE_TRUE_VALUES:
+        return True
+    query = environ.get('QUERY_STRING', '')
+    if '_profile=' not in query:
+        return False
+    values = urllib.parse.parse_qs(query).get('_profile', [])
+    return bool(values) and values[-1].strip().lower() in PROFILE_TRUE_VALUES
+
+def profiling_middleware(wsgi_app):
+    """Run a request under cProfile when an admin asks for it (X-Profile header
+    or ?_profile=1). Requests without the flag pay two environ lookups."""
+    from functools import wraps
+    @wraps(wsgi_app)
+    def middleware(environ, start_response):
+        if not profile_requested(environ):
+            return wsgi_app(environ, start_response)
+
+        token = environ.get('HTTP_AUTHORIZATION', '').strip()
+        session = find_active_session(token) if token else None
+        if not session or session['expired']:
+            return wsgi_app(environ, start_response)
+        if not _profiler_lock.acquire(blocking=False):
+            return wsgi_app(environ, lambda status, headers, *args: start_response(
+                status, headers + [('X-Profile-Id', 'busy')], *args))
+
+        profile_id = f"{int(time.time() * 1000)}_{secrets.token_hex(3)}"
+        def profiled_start_response(status, headers, *args):
+            return start_response(status, headers + [('X-Profile-Id', profile_id)], *args)
+
+        try:
+            profiler = cProfile.Profile()
+            started = time.perf_counter()
+            profiler.enable()
+            try:
+                result = wsgi_app(environ, profiled_start_response)
+                # Drain the body inside the profile so streamed responses count too
+                body = list(result)
+                if hasattr(result, 'close'):
+                    result.close()
+            finally:
+                profiler.disable()
+            try:
+                save_profile(profile_id, profiler, {
+                    'method': environ.get('REQUEST_METHOD'),
+                    'path': environ.get('PATH_INFO'),
+                    'admin': session['username'],
+                    'duration_ms': round((time.perf_counter() - started) * 1000, 2)
+                })
+            except Exception as e:
+                print(f"⚠️ Gagal menyimpan profil: {e}")
+        finally:
+            _profiler_lock.release()
+        return body
+    return middleware
+
+app.wsgi_app = profiling_middleware(app.wsgi_app)
+
+@app.route('/api/admin/profiles', methods=['GET'])
+@require_auth
+def list_profiles():
+    """List saved request profiles, newest first"""
+    try:
+        profiles = []
+        for name in sorted(os.listdir(PROFILE_FOLDER), reverse=True):
+            if not name.endswith('.json'):
+                continue
+            with open(os.path.join(PROFILE_FOLDER, name)) as f:
+                profiles.append(json.load(f))
+        return jsonify({'success': True, 'data': profiles, 'count': len(profiles)}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+@require_auth
+def download_profile(profile_id):
+    """Download a profile: ?format=pstats (default, for snakeviz/pstats) or txt"""
+    fmt = request.args.get('format', 'pstats')
+    if not PROFILE_ID_PATTERN.match(profile_id) or fmt not in ['pstats', 'txt']:
+        return jsonify({'error': 'Profil tidak ditemukan'}), 404
+    ext = 'prof' if fmt == 'pstats' else 'txt'
+    filepath = os.path.join(PROFILE_FOLDER, f'{profile_id}.{ext}')
+    if not os.path.exists(filepath):
+        return jsonify({'error': 'Profil tidak ditemukan'}), 404
+    return send_file(os.path.abspath(filepath), as_attachment=True, download_name=f'{profile_id}.{ext}')
+
 # ============================================================================
 # STATIC FILES
 # ============================================================================
@@ -853,7 +2504,23 @@ if __name__ == '__main__':
     # Initialize database
     print("\n📊 Initializing database...")
     init_db()
-    
+
+    # The debug reloader runs this block in a watcher process and again in the
+    # serving child (WERKZEUG_RUN_MAIN=true); daemons belong in the child only
+    debug = True
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        # Background cleanup of unreferenced images
+        start_image_gc()
+
+        # Daily online backup of data.db and archive.db
+        start_backup_scheduler()
+
+        # Daily move of old finished orders to archive.db
+        start_order_archiver()
+
+        # One-time customer index backfill for orders placed before it existed
+        start_customer_backfill()
+
     print("\n" + "=" * 60)
     print("✅ Server siap dijalankan!")
     print("=" * 60)
@@ -868,6 +2535,6 @@ if __name__ == '__main__':
     app.run(
         host='0.0.0.0',
         port=5000,
-        debug=True,
+        debug=debug,
         threaded=True
     )
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Benchmark - cost of the request profiler when no profile is requested
+Times the profiling middleware around a no-op WSGI app, then full
+GET /api/health requests with and without the middleware.
+Usage: python bench_profiler.py [iterations]
+"""
+
+import sys
+import time
+
+import app as server
+
+ITERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+ROUNDS = 5
+
+def noop_app(environ, start_response):
+    return [b'ok']
+
+def best_us(func):
+    timings = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for _ in range(ITERATIONS):
+            func()
+        timings.append((time.perf_counter() - start) / ITERATIONS * 1e6)
+    return min(timings)
+
+def main():
+    environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': '/api/health', 'QUERY_STRING': 'page=1'}
+    wrapped_noop = server.profiling_middleware(noop_app)
+    bare = best_us(lambda: noop_app(environ, None))
+    wrapped = best_us(lambda: wrapped_noop(environ, None))
+    print(f'no-op app            : {bare:8.3f} us/call')
+    print(f'no-op app + profiler : {wrapped:8.3f} us/call  (+{wrapped - bare:.3f} us)')
+
+    app = server.app
+    client = app.test_client()
+    profiled_wsgi = app.wsgi_app
+    client.get('/api/health')  # warm up
+    with_mw = best_us(lambda: client.get('/api/health'))
+    app.wsgi_app = profiled_wsgi.__wrapped__
+    without_mw = best_us(lambda: client.get('/api/health'))
+    app.wsgi_app = profiled_wsgi
+    print(f'GET /api/health with middleware    : {with_mw:8.2f} us/request')
+    print(f'GET /api/health without middleware : {without_mw:8.2f} us/request')
+
+if __name__ == '__main__':
+    main()
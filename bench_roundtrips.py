@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Benchmark - SQL round trips per admin write request
+Compares the old SELECT-then-write handlers with repository.py.
+update_product+image replaces the image with content already in the store.
+Usage: python bench_roundtrips.py [iterations]
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import repository
+
+ITERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+# Replacing the image with an already spooled multipart file (content seen before,
+# so the image store reuses the stored file as it does for a re-uploaded photo)
+IMAGE = ('/images/product_0123456789abcdef.jpg', '0123456789abcdef' * 4, 2048)
+
+def setup(database):
+    conn = sqlite3.connect(database)
+    conn.executescript('''
+        CREATE TABLE products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, description TEXT,
+            image_path TEXT, price REAL DEFAULT 0, stock INTEGER DEFAULT 0,
+            available BOOLEAN DEFAULT 1, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, status TEXT DEFAULT 'baru',
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE images (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, path TEXT UNIQUE NOT NULL,
+            sha256 TEXT UNIQUE NOT NULL, size INTEGER NOT NULL, orphaned_at TIMESTAMP
+        );
+    ''')
+    conn.executemany(
+        'INSERT INTO products (name, image_path, stock) VALUES (?, ?, ?)',
+        [(f'Produk {i}', f'/images/p{i}.jpg', 10) for i in range(100)]
+    )
+    conn.executemany('INSERT INTO orders (status) VALUES (?)', [('baru',)] * 100)
+    conn.execute('INSERT INTO images (path, sha256, size) VALUES (?, ?, ?)', IMAGE)
+    conn.commit()
+    conn.close()
+
+# Handlers as they were before repository.py: new connection, SELECT, then write
+def old_update_product(database, pid):
+    conn = sqlite3.connect(database)
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+    c.execute('SELECT id FROM products WHERE id = ?', (pid,)).fetchone()
+    existing = c.execute('SELECT image_path FROM products WHERE id = ?', (pid,)).fetchone()
+    c.execute('''
+        UPDATE products SET name = ?, description = ?, image_path = ?, price = ?, stock = ?,
+            available = ?, updated_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+    ''', ('Produk', 'x', existing['image_path'], 1.0, 5, True, pid))
+    conn.commit()
+    conn.close()
+
+def old_store_image(c):
+    existing = c.execute('SELECT path FROM images WHERE sha256 = ?', (IMAGE[1],)).fetchone()
+    if existing:
+        c.execute('UPDATE images SET orphaned_at = NULL WHERE sha256 = ?', (IMAGE[1],))
+        return existing[0]
+    c.execute('INSERT OR REPLACE INTO images (path, sha256, size) VALUES (?, ?, ?)', IMAGE)
+    return IMAGE[0]
+
+def old_update_product_image(database, pid):
+    conn = sqlite3.connect(database)
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+    c.execute('SELECT id FROM products WHERE id = ?', (pid,)).fetchone()
+    c.execute('SELECT image_path FROM products WHERE id = ?', (pid,)).fetchone()
+    image_path = old_store_image(c)
+    c.execute('''
+        UPDATE products SET name = ?, description = ?, image_path = ?, price = ?, stock = ?,
+            available = ?, updated_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+    ''', ('Produk', 'x', image_path, 1.0, 5, True, pid))
+    conn.commit()
+    conn.close()
+
+def old_toggle(database, pid):
+    conn = sqlite3.connect(database)
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+    product = c.execute('SELECT available FROM products WHERE id = ?', (pid,)).fetchone()
+    c.execute('UPDATE products SET available = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+              (not bool(product['available']), pid))
+    conn.commit()
+    conn.close()
+
+def old_stock(database, pid):
+    conn = sqlite3.connect(database)
+    c = conn.cursor()
+    c.execute('SELECT id FROM products WHERE id = ?', (pid,)).fetchone()
+    c.execute('UPDATE products SET stock = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?', (7, pid))
+    conn.commit()
+    conn.close()
+
+def old_order_status(database, oid):
+    conn = sqlite3.connect(database)
+    c = conn.cursor()
+    c.execute('SELECT id FROM orders WHERE id = ?', (oid,)).fetchone()
+    c.execute('UPDATE orders SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?', ('proses', oid))
+    conn.commit()
+    conn.close()
+
+def new_update_product(database, pid):
+    with repository.connection(database) as conn:
+        repository.update_product(conn, pid, 'Produk', 'x', None, 1.0, 5, True)
+
+def new_store_image(conn):
+    # Same statements as app.store_image_file
+    existing = conn.execute('''
+        UPDATE images SET orphaned_at = NULL WHERE sha256 = ? RETURNING path
+    ''', (IMAGE[1],)).fetchall()
+    if existing:
+        return existing[0]['path']
+    conn.execute('INSERT OR REPLACE INTO images (path, sha256, size) VALUES (?, ?, ?)', IMAGE)
+    return IMAGE[0]
+
+def new_update_product_image(database, pid):
+    with repository.connection(database) as conn:
+        if repository.product_exists(conn, pid):
+            image_path = new_store_image(conn)
+            repository.update_product(conn, pid, 'Produk', 'x', image_path, 1.0, 5, True)
+
+def new_toggle(database, pid):
+    with repository.connection(database) as conn:
+        repository.toggle_product_availability(conn, pid)
+
+def new_stock(database, pid):
+    with repository.connection(database) as conn:
+        repository.update_product_stock(conn, pid, 7)
+
+def new_order_status(database, oid):
+    with repository.connection(database) as conn:
+        repository.update_order_status(conn, oid, 'proses')
+
+def count_statements(database, handler):
+    """Run handler once with every connection traced; count SQL statements"""
+    statements = []
+    original_connect = sqlite3.connect
+
+    def traced_connect(*args, **kwargs):
+        conn = original_connect(*args, **kwargs)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    repository.close_all()
+    sqlite3.connect = traced_connect
+    try:
+        handler(database, 1)
+    finally:
+        sqlite3.connect = original_connect
+    repository.close_all()
+    return len([s for s in statements if s.split()[0].upper() not in ('BEGIN', 'COMMIT')])
+
+def timed(database, handler):
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        handler(database, i % 100 + 1)
+    return (time.perf_counter() - start) / ITERATIONS * 1e6
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, 'bench.db')
+        setup(database)
+        cases = [
+            ('update_product', old_update_product, new_update_product),
+            ('update_product+image', old_update_product_image, new_update_product_image),
+            ('toggle_availability', old_toggle, new_toggle),
+            ('update_stock', old_stock, new_stock),
+            ('update_order_status', old_order_status, new_order_status),
+        ]
+        print(f"{'handler':<22}{'stmts old':>10}{'stmts new':>10}{'us/req old':>12}{'us/req new':>12}")
+        for name, old, new in cases:
+            old_count = count_statements(database, old)
+            new_count = count_statements(database, new)
+            old_us = timed(database, old)
+            new_us = timed(database, new)
+            print(f'{name:<22}{old_count:>10}{new_count:>10}{old_us:>12.1f}{new_us:>12.1f}')
+        repository.close_all()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Data Access Layer - SQLite3
+CV Karya Perikanan Indonesia
+Single-statement writes (rowcount / RETURNING) on pooled connections.
+RETURNING needs SQLite 3.35+ (bundled with Python 3.10+). RETURNING cursors
+are drained with fetchall() so no statement is left open at commit.
+"""
+
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Connections are reused across requests so their prepared statements are too.
+# Only the statements in this module (and the few app.py issues on a borrowed
+# connection) run here; they fit in the cache with plenty of room. Everything
+# else in app.py still goes through get_db() and sqlite3's default cache.
+POOL_SIZE = 8
+STATEMENT_CACHE_SIZE = 64
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def _get_pool(database):
+    with _pools_lock:
+        pool = _pools.get(database)
+        if pool is None:
+            pool = queue.LifoQueue(maxsize=POOL_SIZE)
+            _pools[database] = pool
+        return pool
+
+def _open(database):
+    conn = sqlite3.connect(database, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+@contextmanager
+def connection(database):
+    """Borrow a pooled connection. Commits on success, rolls back on error
+    and always hands the connection back (or closes it if the pool is full)."""
+    pool = _get_pool(database)
+    try:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        conn = _open(database)
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        try:
+            pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+def close_all():
+    """Close every pooled connection (used before replacing data.db)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        while True:
+            try:
+                pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+# ============================================================================
+# SESSIONS
+# ============================================================================
+
+def find_session(conn, token):
+    """Active session joined with its admin, or None"""
+    return conn.execute('''
+        SELECT s.id, s.admin_id, s.expires_at, s.active, a.username
+        FROM admin_sessions s
+        JOIN admins a ON a.id = s.admin_id
+        WHERE s.token = ? AND s.active = 1
+    ''', (token,)).fetchone()
+
+# ============================================================================
+# PRODUCTS
+# ============================================================================
+
+def update_product(conn, product_id, name, description, image_path, price, stock, available):
+    """Update a product in one statement. image_path None keeps the current image.
+    Returns the updated row (image_path), or None if the product does not exist."""
+    rows = conn.execute('''
+        UPDATE products
+        SET name = ?, description = ?, image_path = COALESCE(?, image_path), price = ?, stock = ?,
+            available = ?, updated_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+        RETURNING image_path
+    ''', (name, description, image_path, price, stock, available, product_id)).fetchall()
+    return rows[0] if rows else None
+
+def product_exists(conn, product_id):
+    """Read-only existence check, used before storing a replacement image"""
+    return conn.execute('SELECT 1 FROM products WHERE id = ?', (product_id,)).fetchone() is not None
+
+def delete_product(conn, product_id):
+    """Delete a product. Returns False if it did not exist."""
+    return conn.execute('DELETE FROM products WHERE id = ?', (product_id,)).rowcount > 0
+
+def toggle_product_availability(conn, product_id):
+    """Flip the available flag. Returns the new value, or None if not found."""
+    rows = conn.execute('''
+        UPDATE products SET available = NOT available, updated_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+        RETURNING available
+    ''', (product_id,)).fetchall()
+    return bool(rows[0]['available']) if rows else None
+
+def update_product_stock(conn, product_id, stock):
+    """Set stock. Returns False if the product does not exist."""
+    return conn.execute(
+        'UPDATE products SET stock = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+        (stock, product_id)
+    ).rowcount > 0
+
+# ============================================================================
+# ORDERS
+# ============================================================================
+
+def update_order_status(conn, order_id, status):
+    """Set order status. Returns False if the order does not exist."""
+    return conn.execute(
+        'UPDATE orders SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+        (status, order_id)
+    ).rowcount > 0
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['TRANSLATION_BACKEND'] = 'stub'
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """app.py with data.db, images and tmp folders inside tmp_path"""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('public/images', exist_ok=True)
+    import app as server
+    import repository
+    os.makedirs(server.UPLOAD_TMP_FOLDER, exist_ok=True)
+    os.makedirs(server.PROFILE_FOLDER, exist_ok=True)
+    os.makedirs(server.BACKUP_FOLDER, exist_ok=True)
+    repository.close_all()
+    server._idempotency_cache.clear()
+    server.init_db()
+    yield server
+    server._translation_queue.join()
+    repository.close_all()
+
+@pytest.fixture
+def client(server):
+    return server.app.test_client()
+
+@pytest.fixture
+def auth(server):
+    token, _ = server.create_session(1)
+    return {'Authorization': token}
@@ -0,0 +1,59 @@
+import gzip
+import os
+import sqlite3
+
+import pytest
+
+def add_order(server, created_at, status='selesai'):
+    conn = server.get_db()
+    c = conn.cursor()
+    c.execute('''
+        INSERT INTO orders (customer_name, whatsapp, product, quantity, address, status, created_at, customer_phone)
+        VALUES ('Budi', '08123', 'Sisik', 1, 'Jl. A', ?, ?, '628123')
+    ''', (status, created_at))
+    conn.commit()
+    conn.close()
+    return c.lastrowid
+
+@pytest.fixture
+def archived(server):
+    old_id = add_order(server, '2020-01-15 10:00:00')
+    open_id = add_order(server, '2020-01-16 10:00:00', status='baru')
+    new_id = add_order(server, '2999-01-01 10:00:00')
+    assert server.archive_orders() == 1
+    return old_id, open_id, new_id
+
+def order_ids(client, auth, query=''):
+    response = client.get(f'/api/orders{query}', headers=auth)
+    assert response.status_code == 200
+    return {o['id'] for o in response.json['data']}, response.json['archived_until']
+
+def test_default_list_skips_archive(client, auth, archived):
+    old_id, open_id, new_id = archived
+    ids, archived_until = order_ids(client, auth)
+    assert ids == {open_id, new_id}
+    assert archived_until == '2020-01-15 10:00:00'
+
+def test_range_reaching_archive_reads_through(client, auth, archived):
+    old_id, open_id, _ = archived
+    ids, _ = order_ids(client, auth, '?from=2020-01-01&to=2020-12-31')
+    assert ids == {old_id, open_id}
+
+def test_read_through_attaches_read_only(server, archived):
+    conn = server.get_db()
+    server.attach_archive(conn)
+    with pytest.raises(sqlite3.OperationalError):
+        conn.execute('DELETE FROM archive.orders')
+    conn.close()
+
+def test_backup_includes_archive(server, archived, tmp_path):
+    old_id = archived[0]
+    info = server.run_backup()
+    assert info['archive']['name'].startswith('archive-')
+    assert {b['database'] for b in server.list_backups()} == {'data', 'archive'}
+    restored = tmp_path / 'archive-restored.db'
+    with gzip.open(os.path.join(server.BACKUP_FOLDER, info['archive']['name'])) as f_in:
+        restored.write_bytes(f_in.read())
+    conn = sqlite3.connect(restored)
+    assert conn.execute('SELECT id FROM orders').fetchall() == [(old_id,)]
+    conn.close()
@@ -0,0 +1,23 @@
+import gzip
+import os
+import sqlite3
+
+import pytest
+
+def test_backup_is_restorable(server, tmp_path):
+    info = server.run_backup()
+    restored = tmp_path / 'restored.db'
+    with gzip.open(os.path.join(server.BACKUP_FOLDER, info['name'])) as f_in:
+        restored.write_bytes(f_in.read())
+    conn = sqlite3.connect(restored)
+    assert conn.execute('SELECT COUNT(*) FROM products').fetchone()[0] == 3
+    conn.close()
+
+def test_failed_gzip_leaves_no_temp_files(server, monkeypatch):
+    def broken_open(*args, **kwargs):
+        open(args[0], 'wb').close()
+        raise OSError('disk penuh')
+    monkeypatch.setattr(server.gzip, 'open', broken_open)
+    with pytest.raises(OSError):
+        server.run_backup()
+    assert os.listdir(server.BACKUP_FOLDER) == []
@@ -0,0 +1,42 @@
+ORDER = {
+    'customer_name': 'Budi',
+    'whatsapp': '0812-3456-7890',
+    'product': 'Sisik Ikan',
+    'address': 'Jl. Pelabuhan 1'
+}
+
+def place(client, quantity, **extra):
+    response = client.post('/api/orders', json={**ORDER, 'quantity': quantity, **extra})
+    assert response.status_code == 201
+    return response.json['order_id']
+
+def customer(client, auth):
+    response = client.get('/api/customers?whatsapp=%2B62 812 3456 7890', headers=auth)
+    assert response.status_code == 200
+    return response.json['data']
+
+def set_status(client, auth, order_id, status):
+    response = client.patch(f'/api/orders/{order_id}/status', json={'status': status}, headers=auth)
+    assert response.status_code == 200
+
+def test_cancelled_orders_leave_lifetime_totals(client, auth):
+    first = place(client, 10)
+    place(client, 5)
+    set_status(client, auth, first, 'batal')
+    data = customer(client, auth)
+    assert (data['order_count'], data['total_quantity']) == (1, 5)
+
+    set_status(client, auth, first, 'proses')
+    data = customer(client, auth)
+    assert (data['order_count'], data['total_quantity']) == (2, 15)
+
+def test_backfill_matches_live_totals(server, client, auth):
+    first = place(client, 10, email='budi@example.com')
+    place(client, 5)
+    set_status(client, auth, first, 'batal')
+    live = customer(client, auth)
+    server.backfill_customers()
+    rebuilt = customer(client, auth)
+    assert rebuilt['order_count'] == live['order_count'] == 1
+    assert rebuilt['total_quantity'] == live['total_quantity'] == 5
+    assert rebuilt['email'] == live['email'] == 'budi@example.com'
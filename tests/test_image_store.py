@@ -0,0 +1,72 @@
+import hashlib
+import os
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 64
+
+def store(server, conn, data):
+    tmp_path = os.path.join(server.UPLOAD_FOLDER, '.upload_test.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    path = server.store_image_file(conn.cursor(), tmp_path, hashlib.sha256(data).hexdigest(), len(data), 'png', 'product')
+    conn.commit()
+    return path
+
+def test_identical_content_reuses_stored_file(server):
+    conn = server.get_db()
+    first = store(server, conn, PNG)
+    second = store(server, conn, PNG)
+    conn.close()
+    assert first == second
+    assert not os.path.exists(os.path.join(server.UPLOAD_FOLDER, '.upload_test.tmp'))
+
+def test_missing_file_is_stored_again(server):
+    conn = server.get_db()
+    first = store(server, conn, PNG)
+    os.remove(server.image_file_path(first))
+    second = store(server, conn, PNG)
+    conn.close()
+    assert os.path.exists(server.image_file_path(second))
+
+def test_orphan_mark_is_cleared_on_reuse(server):
+    conn = server.get_db()
+    path = store(server, conn, PNG)
+    conn.execute("UPDATE images SET orphaned_at = '2000-01-01T00:00:00' WHERE path = ?", (path,))
+    conn.commit()
+    store(server, conn, PNG)
+    orphaned_at = conn.execute('SELECT orphaned_at FROM images WHERE path = ?', (path,)).fetchone()[0]
+    conn.close()
+    assert orphaned_at is None
+
+def test_placeholder_survives_gc_after_last_user_is_deleted(server, client, auth, monkeypatch):
+    placeholder = server.image_file_path(server.DEFAULT_PRODUCT_IMAGE)
+    with open(placeholder, 'wb') as f:
+        f.write(PNG)
+    response = client.post('/api/products', headers=auth, data={'name': 'Tanpa Foto'})
+    product_id = response.json['product_id']
+    client.delete(f'/api/products/{product_id}', headers=auth)
+
+    monkeypatch.setattr(server, 'IMAGE_GC_GRACE', server.timedelta(seconds=-1))
+    conn = server.get_db()
+    server.collect_orphan_images(conn)
+    server.collect_orphan_images(conn)
+    conn.close()
+    assert os.path.exists(placeholder)
+
+def test_legacy_duplicate_is_merged_into_stored_copy(server):
+    for name in ('lama_a.png', 'lama_b.png'):
+        with open(os.path.join(server.UPLOAD_FOLDER, name), 'wb') as f:
+            f.write(PNG)
+    conn = server.get_db()
+    conn.execute("UPDATE products SET image_path = '/images/lama_a.png' WHERE id = 1")
+    conn.execute("UPDATE products SET image_path = '/images/lama_b.png' WHERE id = 2")
+    conn.commit()
+
+    stats = server.collect_orphan_images(conn)
+    paths = [row[0] for row in conn.execute('SELECT image_path FROM products WHERE id IN (1, 2)')]
+    registered = [row[0] for row in conn.execute('SELECT path FROM images')]
+    conn.close()
+    assert stats['merged_duplicates'] == 1
+    assert paths[0] == paths[1] and paths[0] in registered
+    assert os.path.exists(server.image_file_path(paths[0]))
+    files = os.listdir(server.UPLOAD_FOLDER)
+    assert ('lama_a.png' in files) != ('lama_b.png' in files)
@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+ORDER = {
+    'customer_name': 'Budi',
+    'whatsapp': '0812-3456-7890',
+    'product': 'Sisik Ikan',
+    'quantity': 10,
+    'address': 'Jl. Pelabuhan 1'
+}
+
+def order_count(server):
+    conn = server.get_db()
+    try:
+        return conn.execute('SELECT COUNT(*) FROM orders').fetchone()[0]
+    finally:
+        conn.close()
+
+def test_same_key_replays_original_order(server, client):
+    headers = {'Idempotency-Key': 'abc-123'}
+    first = client.post('/api/orders', json=ORDER, headers=headers)
+    second = client.post('/api/orders', json=ORDER, headers=headers)
+    assert first.status_code == 201
+    assert second.status_code == 201
+    assert second.json['order_id'] == first.json['order_id']
+    assert second.headers['Idempotent-Replayed'] == 'true'
+    assert order_count(server) == 1
+
+def test_replay_survives_cache_eviction(server, client):
+    headers = {'Idempotency-Key': 'abc-123'}
+    first = client.post('/api/orders', json=ORDER, headers=headers)
+    server._idempotency_cache.clear()
+    second = client.post('/api/orders', json=ORDER, headers=headers)
+    assert second.json['order_id'] == first.json['order_id']
+    assert order_count(server) == 1
+
+def test_key_reused_for_different_order_is_rejected(server, client):
+    headers = {'Idempotency-Key': 'abc-123'}
+    client.post('/api/orders', json=ORDER, headers=headers)
+    response = client.post('/api/orders', json={**ORDER, 'quantity': 20}, headers=headers)
+    assert response.status_code == 422
+    assert order_count(server) == 1
+
+def test_overlong_key_is_rejected(server, client):
+    key = 'k' * (server.IDEMPOTENCY_KEY_MAX_LENGTH + 1)
+    response = client.post('/api/orders', json=ORDER, headers={'Idempotency-Key': key})
+    assert response.status_code == 400
+    assert order_count(server) == 0
+
+def test_long_keys_sharing_a_prefix_do_not_collide(server, client):
+    prefix = 'k' * (server.IDEMPOTENCY_KEY_MAX_LENGTH - 1)
+    first = client.post('/api/orders', json=ORDER, headers={'Idempotency-Key': prefix + 'a'})
+    second = client.post('/api/orders', json=ORDER, headers={'Idempotency-Key': prefix + 'b'})
+    assert first.status_code == second.status_code == 201
+    assert second.json['order_id'] != first.json['order_id']
+
+def test_fingerprint_dedupes_within_window(server, client):
+    first = client.post('/api/orders', json=ORDER)
+    second = client.post('/api/orders', json={**ORDER, 'whatsapp': '081234567890', 'product': ' sisik ikan '})
+    assert second.status_code == 201
+    assert second.json['order_id'] == first.json['order_id']
+    assert order_count(server) == 1
+
+def test_fingerprint_expires_after_window(server, client, monkeypatch):
+    monkeypatch.setattr(server, 'ORDER_DEDUPE_WINDOW', timedelta(seconds=-1))
+    first = client.post('/api/orders', json=ORDER)
+    second = client.post('/api/orders', json=ORDER)
+    assert second.json['order_id'] != first.json['order_id']
+    assert 'Idempotent-Replayed' not in second.headers
+    assert order_count(server) == 2
+
+def test_different_order_is_not_deduped(server, client):
+    client.post('/api/orders', json=ORDER)
+    client.post('/api/orders', json={**ORDER, 'quantity': 11})
+    assert order_count(server) == 2
@@ -0,0 +1,31 @@
+import io
+import os
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 64
+
+def image_files(server):
+    return sorted(name for name in os.listdir(server.UPLOAD_FOLDER) if not name.startswith('.'))
+
+def test_update_missing_product_stores_no_image(server, client, auth):
+    before = image_files(server)
+    response = client.put('/api/products/999', headers=auth, data={
+        'name': 'Tidak ada', 'image': (io.BytesIO(PNG), 'foto.png')
+    })
+    assert response.status_code == 404
+    assert image_files(server) == before
+    assert not [name for name in os.listdir(server.UPLOAD_FOLDER) if name.startswith('.upload_')]
+
+def test_update_product_replaces_image(server, client, auth):
+    response = client.put('/api/products/1', headers=auth, data={
+        'name': 'Sisik Ikan', 'image': (io.BytesIO(PNG), 'foto.png')
+    })
+    assert response.status_code == 200
+    image_path = response.json['image_path']
+    assert os.path.exists(server.image_file_path(image_path))
+    assert client.get('/api/products/1').json['image_path'] == image_path
+
+def test_update_product_keeps_image_without_upload(client, auth):
+    client.put('/api/products/1', headers=auth, data={'name': 'A', 'image': (io.BytesIO(PNG), 'foto.png')})
+    first = client.get('/api/products/1').json['image_path']
+    response = client.put('/api/products/1', headers=auth, data={'name': 'B'})
+    assert response.json['image_path'] == first
@@ -0,0 +1,26 @@
+import pytest
+
+@pytest.mark.parametrize('environ, expected', [
+    ({'HTTP_X_PROFILE': '1'}, True),
+    ({'HTTP_X_PROFILE': 'True'}, True),
+    ({'HTTP_X_PROFILE': '0'}, False),
+    ({'HTTP_X_PROFILE': 'false'}, False),
+    ({'HTTP_X_PROFILE': ''}, False),
+    ({'QUERY_STRING': '_profile=1'}, True),
+    ({'QUERY_STRING': 'page=2&_profile=true'}, True),
+    ({'QUERY_STRING': '_profile=0'}, False),
+    ({'QUERY_STRING': 'x_profile=1'}, False),
+    ({'QUERY_STRING': 'note=a_profile=1'}, False),
+    ({'QUERY_STRING': 'page=1'}, False),
+    ({}, False),
+])
+def test_profile_requested(server, environ, expected):
+    assert server.profile_requested(environ) is expected
+
+def test_disabled_flag_does_not_profile(client, auth):
+    response = client.get('/api/health', headers={**auth, 'X-Profile': '0'})
+    assert 'X-Profile-Id' not in response.headers
+
+def test_enabled_flag_profiles(client, auth):
+    response = client.get('/api/health?_profile=1', headers=auth)
+    assert response.headers['X-Profile-Id']
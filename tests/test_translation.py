@@ -0,0 +1,97 @@
+import pytest
+
+@pytest.fixture
+def backend_calls(server, monkeypatch):
+    """Record every batch the stub backend receives"""
+    calls = []
+    def recording_stub(texts, source, target):
+        calls.append(list(texts))
+        return server.stub_translate(texts, source, target)
+    monkeypatch.setitem(server.TRANSLATION_BACKENDS, 'stub', recording_stub)
+    return calls
+
+def stored(server):
+    conn = server.get_db()
+    try:
+        return {row['text_hash']: row['translated'] for row in conn.execute('SELECT * FROM translations')}
+    finally:
+        conn.close()
+
+def test_batch_is_deduped_and_aligned(client, auth, backend_calls):
+    response = client.post('/api/translate', json={'texts': ['Ikan', 'Kakap', 'Ikan']}, headers=auth)
+    assert response.status_code == 200
+    assert response.json['translations'] == ['[en] Ikan', '[en] Kakap', '[en] Ikan']
+    assert backend_calls == [['Ikan', 'Kakap']]
+
+def test_second_call_is_served_from_memory(client, auth, backend_calls):
+    client.post('/api/translate', json={'texts': ['Ikan', 'Kakap']}, headers=auth)
+    response = client.post('/api/translate', json={'texts': ['Kakap', 'Ikan', 'Sisik']}, headers=auth)
+    assert response.json['cache_hits'] == 2
+    assert backend_calls[-1] == ['Sisik']
+
+def test_single_text_mode(client):
+    response = client.post('/api/translate', json={'text': 'Ikan segar'})
+    assert response.json['translatedText'] == '[en] Ikan segar'
+
+def test_anonymous_text_outside_catalogue_is_not_stored(server, client, backend_calls):
+    client.post('/api/translate', json={'text': 'Teks acak'})
+    client.post('/api/translate', json={'text': 'Teks acak'})
+    assert stored(server) == {}
+    assert len(backend_calls) == 2
+
+def test_anonymous_catalogue_text_is_stored(server, client, auth, backend_calls):
+    client.put('/api/products/1', headers=auth, data={'name': 'Kakap Merah', 'description': 'Segar'})
+    server._translation_queue.join()
+    conn = server.get_db()
+    conn.execute('DELETE FROM translations')
+    conn.commit()
+    conn.close()
+    client.post('/api/translate', json={'text': 'Kakap Merah'})
+    assert list(stored(server).values()) == ['[en] Kakap Merah']
+
+def test_backend_misses_are_capped_per_request(server, client, backend_calls):
+    texts = [f'Teks {i}' for i in range(server.TRANSLATE_MAX_MISSES + 5)]
+    response = client.post('/api/translate', json={'texts': texts})
+    assert sum(len(call) for call in backend_calls) == server.TRANSLATE_MAX_MISSES
+    assert response.json['untranslated'] == 5
+    assert response.json['translations'][-1] == texts[-1]
+
+@pytest.mark.parametrize('body', [
+    {'texts': []},
+    {'texts': ['x'] * 101},
+    {'texts': ['x' * 5001]},
+    {'texts': ['x' * 5000] * 5},
+    {'text': 'x', 'target': '../'},
+])
+def test_invalid_requests(client, body):
+    assert client.post('/api/translate', json=body).status_code == 400
+
+def test_update_product_replaces_stale_translations(server, client, auth, backend_calls):
+    client.put('/api/products/1', headers=auth, data={'name': 'Kakap Lama', 'description': 'Segar'})
+    server._translation_queue.join()
+    old_hash = server.text_hash('Kakap Lama')
+    assert old_hash in stored(server)
+
+    client.put('/api/products/1', headers=auth, data={'name': 'Kakap Baru', 'description': 'Segar'})
+    server._translation_queue.join()
+    translations = stored(server)
+    assert old_hash not in translations
+    assert translations[server.text_hash('Kakap Baru')] == '[en] Kakap Baru'
+    assert backend_calls[-1] == ['Kakap Baru']
+
+def test_failed_precompute_is_retried(server, monkeypatch, backend_calls):
+    fields = {'name': 'Kakap Merah'}
+    monkeypatch.setitem(server.TRANSLATION_BACKENDS, 'stub', lambda texts, source, target: [None] * len(texts))
+    server.refresh_entity_translations('product', 1, fields)
+    assert stored(server) == {}
+
+    monkeypatch.setitem(server.TRANSLATION_BACKENDS, 'stub', server.stub_translate)
+    server.refresh_entity_translations('product', 1, fields)
+    assert stored(server) == {server.text_hash('Kakap Merah'): '[en] Kakap Merah'}
+
+def test_deleted_product_drops_its_translations(server, client, auth):
+    client.put('/api/products/1', headers=auth, data={'name': 'Kakap Hapus', 'description': 'Segar'})
+    server._translation_queue.join()
+    client.delete('/api/products/1', headers=auth)
+    server._translation_queue.join()
+    assert server.text_hash('Kakap Hapus') not in stored(server)
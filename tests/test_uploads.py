@@ -0,0 +1,78 @@
+import threading
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00\x00\x00\rIHDR' + b'\x00' * 100
+
+def start(client, auth, size=len(PNG), filename='foto.png'):
+    response = client.post('/api/uploads', json={'filename': filename, 'size': size}, headers=auth)
+    return response.json['upload_id']
+
+def put(client, auth, upload_id, offset, chunk):
+    return client.put(f'/api/uploads/{upload_id}?offset={offset}', data=chunk, headers=auth)
+
+def test_signature_split_across_small_chunks(client, auth):
+    upload_id = start(client, auth)
+    offset = 0
+    for chunk in (PNG[:5], PNG[5:9], PNG[9:]):
+        response = put(client, auth, upload_id, offset, chunk)
+        assert response.status_code == 200
+        offset = response.json['received']
+    response = client.post(f'/api/uploads/{upload_id}/finalize', headers=auth)
+    assert response.status_code == 200
+    assert response.json['image_path'].startswith('/images/product_')
+
+def test_wrong_signature_rejected_once_complete(client, auth):
+    upload_id = start(client, auth)
+    fake = b'GIF89a' + PNG[6:]
+    assert put(client, auth, upload_id, 0, fake[:5]).status_code == 200
+    assert put(client, auth, upload_id, 5, fake[5:]).status_code == 415
+
+def test_finalize_rejects_file_shorter_than_signature(client, auth):
+    upload_id = start(client, auth, size=None)
+    put(client, auth, upload_id, 0, PNG[:8])
+    assert client.post(f'/api/uploads/{upload_id}/finalize', headers=auth).status_code == 415
+
+def test_concurrent_finalize_returns_same_image(server, client, auth):
+    upload_id = start(client, auth)
+    put(client, auth, upload_id, 0, PNG)
+    results = []
+
+    def finalize():
+        response = server.app.test_client().post(f'/api/uploads/{upload_id}/finalize', headers=auth)
+        results.append((response.status_code, response.json.get('image_path')))
+
+    threads = [threading.Thread(target=finalize) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert {status for status, _ in results} == {200}
+    assert len({path for _, path in results}) == 1
+
+def test_chunk_after_finalize_is_rejected(client, auth):
+    upload_id = start(client, auth)
+    put(client, auth, upload_id, 0, PNG)
+    client.post(f'/api/uploads/{upload_id}/finalize', headers=auth)
+    assert put(client, auth, upload_id, len(PNG), b'\x00').status_code == 409
+
+def test_oversized_chunk_returns_413_with_progress(server, client, auth):
+    upload_id = start(client, auth, size=None)
+    put(client, auth, upload_id, 0, PNG)
+    response = put(client, auth, upload_id, len(PNG), b'\x00' * (server.MAX_IMAGE_SIZE + 1024 * 1024))
+    assert response.status_code == 413
+    assert response.json['received'] == len(PNG)
+    assert client.get(f'/api/uploads/{upload_id}', headers=auth).json['received'] == len(PNG)
+
+def test_oversized_chunk_without_content_length(server, client, auth, monkeypatch):
+    import io
+    upload_id = start(client, auth, size=None)
+    put(client, auth, upload_id, 0, PNG)
+    monkeypatch.setitem(server.app.config, 'MAX_CONTENT_LENGTH', 64)
+    response = client.put(f'/api/uploads/{upload_id}?offset={len(PNG)}', headers=auth,
+                          input_stream=io.BytesIO(b'\x00' * 4096),
+                          environ_overrides={'wsgi.input_terminated': True})
+    assert response.status_code == 413
+    assert response.json['received'] == len(PNG)
+
+def test_boolean_size_is_rejected(client, auth):
+    response = client.post('/api/uploads', json={'filename': 'foto.png', 'size': True}, headers=auth)
+    assert response.status_code == 400